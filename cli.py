@@ -0,0 +1,89 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from dotenv import load_dotenv
+from core.conversation import ConversationManager
+from core.metrics import registry
+from core.resilience import upstream_status
+from core.pipeline import build_llm, build_resolver, build_tools, get_response_cache, get_search_cache, get_search_flight
+from core.session import Session
+
+def warn(message):
+    print(f"Warning: {message}", file=sys.stderr)
+
+def read_queries(interactive: bool):
+    while True:
+        if interactive:
+            print("> ", end="", file=sys.stderr, flush=True)
+        line = sys.stdin.readline()
+        if not line:
+            return
+        query = line.strip()
+        if query:
+            yield query
+
+def main():
+    parser = argparse.ArgumentParser(description="Movie Research Assistant without the GUI. "
+                                     "Reads one query per line and writes one JSON answer per line.")
+    parser.add_argument("--model", help="Groq model to use, or 'auto' to route each query (default)")
+    parser.add_argument("--trailer-timeout", type=float, default=10.0,
+                        help="seconds to wait for trailer lookups before writing an answer")
+    parser.add_argument("--fresh", action="store_true", help="always ask the model instead of reusing cached answers")
+    parser.add_argument("--session", metavar="ID",
+                        help="save the conversation as a session; 'new' starts one, an existing id resumes it")
+    parser.add_argument("--stats", action="store_true", help="print cache statistics and stage latencies on exit")
+    args = parser.parse_args()
+    
+    load_dotenv()
+    
+    # Built once and reused for every query so connections, caches and
+    # worker threads stay warm across the whole run.
+    try:
+        llm = build_llm()
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if args.model:
+        llm.set_model(args.model)
+    session = None
+    if args.session:
+        try:
+            session = Session.create() if args.session == "new" else Session.open(args.session)
+        except FileNotFoundError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(f"Session: {session.id}", file=sys.stderr)
+    conversation = ConversationManager(build_tools(warn), llm, resolver=build_resolver(), session=session)
+    threading.Thread(target=conversation.warm, daemon=True).start()
+    
+    try:
+        for query in read_queries(sys.stdin.isatty()):
+            started = time.monotonic()
+            response, tool_results = conversation.process_query(query, use_cache=not args.fresh)
+            conversation.wait_pending(args.trailer_timeout)
+            
+            print(json.dumps({
+                "query": query,
+                "response": response,
+                "tool_results": tool_results,
+                "elapsed": round(time.monotonic() - started, 3)
+            }), flush=True)
+    except KeyboardInterrupt:
+        pass
+    
+    if args.stats:
+        print(json.dumps({
+            "search_cache": get_search_cache().stats(),
+            "response_cache": get_response_cache().stats(),
+            "search_flight": get_search_flight().stats(),
+            "llm_flight": llm.flight.stats(),
+            "models": llm.router.status(),
+            "upstreams": upstream_status()
+        }), file=sys.stderr)
+        print(registry.dump(), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "what", "when", "where",
+    "which", "who", "why", "how", "with", "about", "me", "tell", "show", "please", "can", "you", "i"
+))
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    # Inverted index over short passages, updated one passage at a time.
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.lengths: Dict[int, int] = {}
+        self.total_length = 0
+    
+    def __len__(self) -> int:
+        return len(self.lengths)
+    
+    def add(self, doc_id: int, text: str):
+        terms = Counter(tokenize(text))
+        for term, count in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+        length = sum(terms.values())
+        self.lengths[doc_id] = length
+        self.total_length += length
+    
+    def remove(self, doc_id: int, text: str):
+        for term in set(tokenize(text)):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.lengths.pop(doc_id, 0)
+    
+    def search(self, query: str, limit: int, exclude: Optional[Set[int]] = None) -> List[Tuple[int, float]]:
+        if not self.lengths:
+            return []
+        count = len(self.lengths)
+        average = self.total_length / count or 1
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / average)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        if exclude:
+            for doc_id in exclude:
+                scores.pop(doc_id, None)
+        # Ties go to the most recently added passage.
+        return heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from core.search import SearchTool
+from core.titles import Title
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+class SearchCache:
+    def __init__(self, path: str, max_entries: int = 5000, negative_ttl: float = 600):
+        self.path = path
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        # A single connection guarded by a lock; the worker threads spawned by
+        # the UI and the search executor all share it.
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            "tool TEXT NOT NULL, query TEXT NOT NULL, payload TEXT NOT NULL, "
+            "expires REAL NOT NULL, accessed REAL NOT NULL, PRIMARY KEY (tool, query))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS search_cache_accessed ON search_cache (accessed)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+    
+    def get(self, tool: str, query: str) -> Optional[Dict[str, Any]]:
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires FROM search_cache WHERE tool = ? AND query = ?", (tool, key)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM search_cache WHERE tool = ? AND query = ?", (tool, key))
+                    self._conn.commit()
+                    self._size -= 1
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE search_cache SET accessed = ? WHERE tool = ? AND query = ?", (now, tool, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+    
+    def put(self, tool: str, query: str, results: Dict[str, Any], ttl: float):
+        # Empty lookups are cached too, but only briefly, so a title with no
+        # trailer does not burn quota on every repeat.
+        if results.get("error") or not results.get("results"):
+            ttl = min(ttl, self.negative_ttl)
+        
+        key = normalize_query(query)
+        now = time.time()
+        payload = json.dumps(results)
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM search_cache WHERE tool = ? AND query = ?", (tool, key)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (tool, query, payload, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (tool, key, payload, now + ttl, now)
+            )
+            if not exists:
+                self._size += 1
+            self._evict()
+            self._conn.commit()
+    
+    def _evict(self):
+        overflow = self._size - self.max_entries
+        if overflow <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM search_cache WHERE rowid IN "
+            "(SELECT rowid FROM search_cache ORDER BY accessed LIMIT ?)", (overflow,)
+        )
+        self._size -= overflow
+        self.evictions += overflow
+    
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM search_cache")
+            self._conn.commit()
+            self._size = 0
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+class CachedSearchTool(SearchTool):
+    def __init__(self, tool: SearchTool, cache: SearchCache, ttl: float = 86400):
+        super().__init__(tool.name, tool.key, role=tool.role, timeout=tool.timeout)
+        self.tool = tool
+        self.cacheable = tool.cacheable
+        self.cache = cache
+        self.ttl = ttl
+    
+    def build_query(self, query: str, title: Optional[Title] = None) -> str:
+        return self.tool.build_query(query, title)
+    
+    def warm(self):
+        self.tool.warm()
+    
+    def search(self, query: str) -> Dict[str, Any]:
+        cached = self.cache.get(self.name, query)
+        if cached is not None:
+            cached["cached"] = True
+            return cached
+        
+        results = self.tool.search(query)
+        # Failures (timeouts, throttling, an open circuit) are transient and
+        # must not be served from the cache once the upstream recovers.
+        if not results.get("error"):
+            self.cache.put(self.name, query, results, self.ttl)
+        return results
+
+
+def response_key(model: str, system_prompt: str, prompt: str, context: Optional[str]) -> str:
+    context_hash = hashlib.sha256((context or "").encode("utf-8")).hexdigest()
+    parts = [model, system_prompt, normalize_query(prompt), context_hash]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    def __init__(self, ttl: float = 6 * 3600, max_bytes: int = 8 * 1024 * 1024, path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        # In-memory LRU front bounded by the size of the stored responses,
+        # optionally backed by SQLite so answers survive restarts.
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = _connect(path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM response_cache WHERE expires < ?", (time.time(),))
+            self._conn.commit()
+    
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self._remove(key)
+            
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT response, expires FROM response_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] >= now:
+                    self._store(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+            
+            self.misses += 1
+            return None
+    
+    def put(self, key: str, response: str):
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._store(key, response, expires)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, response, expires) VALUES (?, ?, ?)",
+                    (key, response, expires)
+                )
+                self._conn.commit()
+    
+    def _store(self, key: str, response: str, expires: float):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expires, response)
+        self._bytes += len(response)
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+    
+    def _remove(self, key: str):
+        expires, response = self._entries.pop(key)
+        self._bytes -= len(response)
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,153 @@
+import threading
+from core.bm25 import BM25Index
+from core.entities import Entity, EntityStore
+from core.extract import FACT_FIELDS
+from typing import Dict, Any, List, Optional
+
+FACT_LABELS = {"rating": "Rating", "release_date": "Released", "director": "Director", "cast": "Cast"}
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text with Llama-style
+    # tokenizers; close enough for budgeting without loading a tokenizer.
+    return len(text) // 4 + 1
+
+def format_result(tool_name: str, result: Dict[str, Any]) -> str:
+    if tool_name == "DuckDuckGo Search":
+        # Facts pulled out at ingest stand in for the raw snippet.
+        facts = result.get("facts")
+        if facts:
+            summary = "; ".join(f"{FACT_LABELS[field]}: {facts[field]}" for field in FACT_FIELDS if field in facts)
+            return f"{result.get('title', '')}\n   {summary}\n"
+        return (
+            f"{result.get('title', '')}\n"
+            f"   {result.get('snippet', '')}\n"
+        )
+    elif tool_name == "OMDB Search":
+        return (
+            f"{result.get('title', '')} ({result.get('year', '')})\n"
+            f"   IMDB Rating: {result.get('rating', 'N/A')}\n"
+            f"   Genre: {result.get('genre', '')}\n"
+            f"   Director: {result.get('director', '')}\n"
+            f"   Actors: {result.get('actors', '')}\n"
+            f"   Plot: {result.get('plot', '')}\n"
+            f"   IMDB: {result.get('imdbLink', '')}\n"
+        )
+    elif tool_name == "YouTube Search":
+        return (
+            f"{result.get('title', '')}\n"
+            f"   {result.get('description', '')}\n"
+            f"   Link: {result.get('link', '')}\n"
+        )
+    return ""
+
+def format_tool_results(tool_name: str, query: str, results: List[Dict[str, Any]]) -> str:
+    context_parts = [f"Search results for '{query}' using {tool_name}:"]
+    for i, result in enumerate(results, 1):
+        context_parts.append(f"{i}. {format_result(tool_name, result)}")
+    return "\n".join(context_parts)
+
+class Passage:
+    # One search result or film record, the unit that is indexed and
+    # selected for context.
+    __slots__ = ("turn", "text", "tokens", "entity")
+    
+    def __init__(self, turn: int, text: str, entity: Optional[str] = None):
+        self.turn = turn
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        self.entity = entity
+
+class ContextStore:
+    # Holds every search result of the session as a passage in a BM25 index.
+    # Results about a film are merged into its record in the entity store,
+    # which is indexed as a single passage that moves to the turn it was
+    # last touched in, so a film is sent once however often it was looked up.
+    # A prompt gets the current and previous turn's passages, then whichever
+    # earlier ones rank best against the question, within the budget.
+    def __init__(self, max_turns: int = 200, top_k: int = 8, recent_turns: int = 1,
+                 entities: Optional[EntityStore] = None):
+        # Turns this far back are dropped to keep long sessions bounded.
+        self.max_turns = max_turns
+        self.top_k = top_k
+        self.recent_turns = recent_turns
+        self.entities = entities or EntityStore()
+        self.passages: Dict[int, Passage] = {}
+        self.turns: Dict[int, List[int]] = {}
+        self.entity_passages: Dict[str, int] = {}
+        self.index = BM25Index()
+        self._next_id = 0
+        self._lock = threading.Lock()
+    
+    def _add_passage(self, turn: int, text: str, entity: Optional[str] = None) -> int:
+        passage_id = self._next_id
+        self._next_id += 1
+        self.passages[passage_id] = Passage(turn, text, entity)
+        self.turns.setdefault(turn, []).append(passage_id)
+        self.index.add(passage_id, text)
+        return passage_id
+    
+    def _add_entity(self, turn: int, entity: Entity):
+        previous = self.entity_passages.pop(entity.key, None)
+        if previous is not None:
+            passage = self.passages.pop(previous)
+            self.turns[passage.turn].remove(previous)
+            self.index.remove(previous, passage.text)
+        self.entity_passages[entity.key] = self._add_passage(turn, entity.render(), entity.key)
+    
+    def add(self, turn: int, tool_name: str, query: str, results: List[Dict[str, Any]],
+            subject: Optional[Dict[str, Any]] = None, at: Optional[float] = None):
+        if not results:
+            return
+        with self._lock:
+            entities, leftover = self.entities.ingest(turn, tool_name, results, subject, at)
+            for entity in entities:
+                self._add_entity(turn, entity)
+            for result in leftover:
+                self._add_passage(turn, f"From {tool_name} ('{query}'):\n{format_result(tool_name, result)}")
+            
+            oldest = turn - self.max_turns
+            while self.turns and next(iter(self.turns)) <= oldest:
+                for passage_id in self.turns.pop(next(iter(self.turns))):
+                    passage = self.passages.pop(passage_id)
+                    self.index.remove(passage_id, passage.text)
+                    if passage.entity:
+                        self.entity_passages.pop(passage.entity, None)
+    
+    def load_entities(self, data: Optional[Dict[str, Any]]):
+        # Records saved with a session come back at the turn they were last
+        # touched in, oldest first.
+        with self._lock:
+            for entity in sorted(self.entities.load(data), key=lambda entity: entity.turn):
+                self._add_entity(entity.turn, entity)
+    
+    def build(self, turn: int, budget: int, query: str = "") -> str:
+        selected = []
+        used = 0
+        
+        with self._lock:
+            recent = set()
+            for previous in range(turn, max(turn - self.recent_turns, 0) - 1, -1):
+                for passage_id in self.turns.get(previous, []):
+                    recent.add(passage_id)
+                    passage = self.passages[passage_id]
+                    if passage.text in selected:
+                        continue
+                    if used + passage.tokens <= budget:
+                        selected.append(passage.text)
+                        used += passage.tokens
+            
+            # Repeated lookups store identical passages; each is sent once.
+            relevant = []
+            for passage_id, score in self.index.search(query, self.top_k * 2, exclude=recent):
+                passage = self.passages[passage_id]
+                if passage.text in selected or passage.text in relevant:
+                    continue
+                if used + passage.tokens > budget or len(relevant) == self.top_k:
+                    break
+                relevant.append(passage.text)
+                used += passage.tokens
+        
+        if relevant:
+            selected.append("Earlier results that may be relevant:")
+            selected.extend(relevant)
+        return "\n".join(selected)
@@ -1,101 +1,425 @@
+import logging
+import os
+import queue
 import time
-from typing import List, Dict, Any, Tuple, Optional
-from core.search import SearchTool
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import List, Dict, Any, Iterator, Tuple, Optional, Callable
+from core.search import SearchTool, CONTEXT, DECORATION
 from core.llm import LLMClient
+from core.context import ContextStore, estimate_tokens
+from core.extract import attach_facts
+from core.history import ConversationHistory, HistoryEntry
+from core.paths import data_path
+from core.prefetch import Prefetcher
+from core.session import Session
+from core.metrics import Span, registry, timed
+
+logger = logging.getLogger(__name__)
+
+class QueryCancelled(Exception):
+    pass
+
+_END = object()
 
 class ConversationManager:
-    def __init__(self, tools: List[SearchTool], llm: LLMClient):
+    def __init__(self, tools: List[SearchTool], llm: LLMClient, max_workers: int = 4, resolver=None,
+                 history_window: int = 1000, history_path: Optional[str] = None,
+                 session: Optional[Session] = None, resume_tail: int = 200,
+                 prefetcher: Optional[Prefetcher] = None):
         self.tools = {tool.name: tool for tool in tools}
         self.llm = llm
-        self.history = []
-    
-    def add_message(self, role: str, content: str):
-        self.history.append({
-            "role": role,
-            "content": content,
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-        })
-    
-    def add_tool_call(self, tool_name: str, query: str, results: Dict[str, Any]):
-        self.history.append({
-            "role": "tool",
-            "tool": tool_name,
+        self.resolver = resolver
+        self.session = session
+        self.prefetcher = prefetcher
+        self.context_store = ContextStore()
+        self.turn = 0
+        if session:
+            self.history = session.history(history_window, resume_tail)
+            self._resume()
+        else:
+            if history_path is None:
+                history_path = data_path("history", f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl")
+            self.history = ConversationHistory(window=history_window, log_path=history_path)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search")
+        self.listeners: List[Callable[[], None]] = []
+        self._lock = threading.RLock()
+        self._pending = set()
+        # Turns still being processed, and the entries of those that are
+        # not the oldest one; they are held back so that concurrent queries
+        # never interleave in the history.
+        self._open_turns = set()
+        self._buffered: Dict[int, List[HistoryEntry]] = {}
+        # Decorations still outstanding per turn, and the turns that have
+        # been answered but stay open until those land or time out.
+        self._decorations: Dict[int, int] = {}
+        self._answered = set()
+    
+    def _resume(self):
+        # Only the tail loaded from the session feeds the context; turn
+        # numbers are counted back from the total kept in its metadata.
+        self.turn = self.session.meta.get("turns", 0)
+        self.context_store.load_entities(self.session.load_entities())
+        tail = list(self.history.recent())
+        turn = self.turn - sum(1 for entry in tail if entry.role == "user")
+        for entry in tail:
+            if entry.role == "user":
+                turn += 1
+            elif entry.role == "tool" and entry.results:
+                self.context_store.add(max(turn, 0), entry.tool, entry.query, entry.results.get("results", []),
+                                       entry.results.get("subject"), entry.created)
+    
+    def _session_result(self, tool: SearchTool, tool_query: str) -> Optional[Dict[str, Any]]:
+        if self.session is None:
+            return None
+        entry = self.history.find_tool_result(tool.name, tool_query)
+        if entry is None:
+            return None
+        results = dict(entry.results)
+        results["cached"] = True
+        return results
+    
+    def warm(self):
+        # Loads the LLM client and every tool's heavy dependencies ahead of
+        # the first query; safe to run on a background thread.
+        for component in [self.llm, *self.tools.values()]:
+            try:
+                component.warm()
+            except Exception:
+                pass
+    
+    def add_listener(self, listener: Callable[[], None]):
+        self.listeners.append(listener)
+    
+    def _notify(self):
+        for listener in self.listeners:
+            listener()
+    
+    def _append(self, turn: Optional[int], entry: HistoryEntry):
+        with self._lock:
+            if turn in self._open_turns and turn != min(self._open_turns):
+                self._buffered.setdefault(turn, []).append(entry)
+            else:
+                self.history.append(entry)
+    
+    def _open_turn(self) -> int:
+        with self._lock:
+            self.turn += 1
+            self._open_turns.add(self.turn)
+            return self.turn
+    
+    def _close_turn(self, turn: int):
+        with self._lock:
+            if self._decorations.get(turn):
+                self._answered.add(turn)
+            else:
+                self._release_turn(turn)
+    
+    def _release_turn(self, turn: int):
+        with self._lock:
+            self._answered.discard(turn)
+            self._open_turns.discard(turn)
+            head = min(self._open_turns) if self._open_turns else None
+            for buffered in sorted(self._buffered):
+                if head is not None and buffered > head:
+                    break
+                for entry in self._buffered.pop(buffered):
+                    self.history.append(entry)
+    
+    def is_recorded(self, turn: int) -> bool:
+        # False while the turn's entries are held back behind an older turn.
+        with self._lock:
+            return turn not in self._buffered
+    
+    def add_message(self, role: str, content: str, turn: Optional[int] = None):
+        self._append(turn, HistoryEntry(role, content=content))
+    
+    def add_tool_call(self, tool_name: str, query: str, results: Dict[str, Any], turn: Optional[int] = None):
+        attach_facts(tool_name, results)
+        with self._lock:
+            self.context_store.add(self.turn if turn is None else turn, tool_name, query, results.get("results", []),
+                                   results.get("subject"))
+            self._append(turn, HistoryEntry("tool", tool=tool_name, query=query, results=results))
+    
+    def get_context_from_history(self, query: str = "") -> str:
+        return self.context_store.build(self.turn, self.llm.context_budget(query), query)
+    
+    def _timeout_result(self, tool: SearchTool, query: str) -> Dict[str, Any]:
+        return {
+            "tool": tool.name,
             "query": query,
-            "results": results,
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-        })
-    
-    def get_context_from_history(self) -> str:
-        context_parts = []
-        
-        for entry in self.history:
-            if entry["role"] == "tool" and "results" in entry:
-                tool_results = entry["results"].get("results", [])
-                if tool_results:
-                    context_parts.append(f"Search results for '{entry['query']}' using {entry['tool']}:")
-                    
-                    if entry["tool"] == "DuckDuckGo Search":
-                        for i, result in enumerate(tool_results, 1):
-                            context_parts.append(
-                                f"{i}. {result.get('title', '')}\n"
-                                f"   {result.get('snippet', '')}\n"
-                            )
-                    elif entry["tool"] == "OMDB Search":
-                        for i, result in enumerate(tool_results, 1):
-                            context_parts.append(
-                                f"{i}. {result.get('title', '')} ({result.get('year', '')})\n"
-                                f"   IMDB Rating: {result.get('rating', 'N/A')}\n"
-                                f"   Genre: {result.get('genre', '')}\n"
-                                f"   Director: {result.get('director', '')}\n"
-                                f"   Actors: {result.get('actors', '')}\n"
-                                f"   Plot: {result.get('plot', '')}\n"
-                                f"   IMDB: {result.get('imdbLink', '')}\n"
-                            )
-                    elif entry["tool"] == "YouTube Search":
-                        for i, result in enumerate(tool_results, 1):
-                            context_parts.append(
-                                f"{i}. {result.get('title', '')}\n"
-                                f"   {result.get('description', '')}\n"
-                                f"   Link: {result.get('link', '')}\n"
-                            )
-        
-        return "\n".join(context_parts)
-    
-    def process_query(self, query: str) -> Tuple[str, Dict[str, Any]]:
-        self.add_message("user", query)
-        
-        tool_results = {}
-        
-        self.add_message("assistant", f"Calling DuckDuckGo search: {query}")
-        
-        search_tool = self.tools.get("DuckDuckGo Search")
-        if search_tool:
-            imdb_query = f"{query} imdb rating release date director starring"
-            search_results = search_tool.search(imdb_query)
-            self.add_tool_call(search_tool.name, imdb_query, search_results)
-            tool_results["search"] = search_results
-        
-        self.add_message("assistant", f"Calling YouTube search: {query}")
-        
-        youtube_tool = self.tools.get("YouTube Search")
-        if youtube_tool:
-            trailer_query = f"{query} trailer"
-            youtube_results = youtube_tool.search(trailer_query)
+            "error": f"Timed out after {tool.timeout:g}s",
+            "results": []
+        }
+    
+    def _error_result(self, tool: SearchTool, query: str, error: Exception) -> Dict[str, Any]:
+        return {"tool": tool.name, "query": query, "error": str(error), "results": []}
+    
+    def _timed_search(self, tool: SearchTool, tool_query: str, spans: List[Dict[str, Any]],
+                      use_cache: bool = True, prefetched: Optional[Future] = None) -> Dict[str, Any]:
+        with timed(f"tool:{tool.name}", spans) as span:
+            # Lookups already made in this session are answered from its log.
+            results = self._session_result(tool, tool_query) if use_cache else None
+            if results is None and prefetched is not None:
+                try:
+                    results = prefetched.result(timeout=tool.timeout)
+                    span.attrs["prefetched"] = True
+                except Exception:
+                    results = None
+            if results is None:
+                results = tool.search(tool_query)
+            span.attrs["results"] = len(results.get("results", []))
+            if results.get("cached"):
+                span.attrs["cached"] = True
+            if results.get("error"):
+                span.attrs["error"] = results["error"]
+        return results
+    
+    def _record_tool_result(self, turn: int, query: str, tool: SearchTool, tool_query: str,
+                            results: Dict[str, Any], tool_results: Dict[str, Any]):
+        if tool.key == "youtube" and len(results.get("results", [])) > 1:
+            results["results"] = [results["results"][0]]
+        # The resolved title is stored with the results so the film they
+        # are about is known again when a session is resumed.
+        if "title" in tool_results:
+            results.setdefault("subject", tool_results["title"])
+        
+        with self._lock:
+            self.add_tool_call(tool.name, tool_query, results, turn)
+            tool_results[tool.key] = results
             
-            if youtube_results.get("results") and len(youtube_results["results"]) > 1:
-                youtube_results["results"] = [youtube_results["results"][0]]
-                
-            self.add_tool_call(youtube_tool.name, trailer_query, youtube_results)
-            tool_results["youtube"] = youtube_results
+            if tool.key == "youtube" and results.get("results"):
+                trailer_info = results["results"][0]
+                self.add_message("assistant", f"Found Trailer for {query}: {trailer_info.get('link', '')}", turn)
+    
+    def _attach_decoration(self, turn: int, query: str, tool: SearchTool, tool_query: str,
+                           future: Future, tool_results: Dict[str, Any],
+                           cancel_event: Optional[threading.Event] = None):
+        # The turn stays open until the decoration lands or times out, so
+        # its result is recorded with its own turn and later turns wait
+        # behind it instead of interleaving.
+        settled = []
+        
+        def settle(results: Dict[str, Any]):
+            with self._lock:
+                if settled:
+                    return
+                settled.append(True)
+                # Results of a cancelled query are dropped.
+                if cancel_event is None or not cancel_event.is_set():
+                    self._record_tool_result(turn, query, tool, tool_query, results, tool_results)
+                self._decorations[turn] -= 1
+                if not self._decorations[turn]:
+                    del self._decorations[turn]
+                    if turn in self._answered:
+                        self._release_turn(turn)
+            self._notify()
+        
+        def on_done(done: Future):
+            timer.cancel()
+            with self._lock:
+                self._pending.discard(done)
+            try:
+                results = done.result()
+            except Exception as e:
+                results = self._error_result(tool, tool_query, e)
+            settle(results)
+        
+        timer = threading.Timer(tool.timeout, lambda: settle(self._timeout_result(tool, tool_query)))
+        timer.daemon = True
+        with self._lock:
+            self._pending.add(future)
+            self._decorations[turn] = self._decorations.get(turn, 0) + 1
+        timer.start()
+        future.add_done_callback(on_done)
+    
+    def wait_pending(self, timeout: Optional[float] = None) -> bool:
+        with self._lock:
+            pending = list(self._pending)
+        done, not_done = wait(pending, timeout=timeout)
+        return not not_done
+    
+    def _await(self, future: Future, timeout: Optional[float], cancel_event: Optional[threading.Event]) -> Any:
+        # Like future.result(timeout), but gives up as soon as the query is
+        # cancelled; the abandoned call finishes (or is dropped) on its own.
+        if cancel_event is None:
+            return future.result(timeout=timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if cancel_event.is_set():
+                future.cancel()
+                raise QueryCancelled()
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise FutureTimeoutError()
+            done, _ = wait([future], timeout=0.1 if remaining is None else min(remaining, 0.1))
+            if done:
+                return future.result()
+    
+    def _read_cancellable(self, stream: Iterator[str], cancel_event: threading.Event) -> Iterator[str]:
+        # The stream is read on a worker so that a cancel is noticed while it
+        # is still being opened (rate limit, failover, a shared call) and
+        # between slow chunks, not only when the next chunk arrives.
+        pending = queue.Queue()
+        stop = threading.Event()
+        
+        def pump():
+            try:
+                for chunk in stream:
+                    if stop.is_set():
+                        break
+                    pending.put(chunk)
+            finally:
+                # Closing the stream ends the request to Groq.
+                stream.close()
+                pending.put(_END)
+        
+        future = self.executor.submit(pump)
+        try:
+            while True:
+                if cancel_event.is_set():
+                    raise QueryCancelled()
+                try:
+                    chunk = pending.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if chunk is _END:
+                    future.result()
+                    return
+                yield chunk
+        finally:
+            stop.set()
+            # A pump that never started leaves the stream unopened.
+            if future.cancel():
+                stream.close()
+    
+    def process_query(self, query: str, on_token: Optional[Callable[[str], None]] = None,
+                      use_cache: bool = True, cancel_event: Optional[threading.Event] = None,
+                      on_progress: Optional[Callable[[str], None]] = None,
+                      on_turn: Optional[Callable[[int], None]] = None) -> Tuple[str, Dict[str, Any]]:
+        turn = self._open_turn()
+        if on_turn:
+            on_turn(turn)
+        try:
+            return self._process_turn(turn, query, on_token, use_cache, cancel_event, on_progress or (lambda stage: None))
+        except QueryCancelled:
+            self.add_message("assistant", "⏹ Query cancelled.", turn)
+            raise
+        finally:
+            self._close_turn(turn)
+            self._notify()
+            if self.session:
+                self._save_session(query)
+    
+    def _save_session(self, query: str):
+        # The answer is already recorded in the log; a failed save is
+        # reported but never replaces the query's result.
+        try:
+            self.session.save(turns=self.turn, title=self.session.meta.get("title") or query[:80])
+            snapshot = self.context_store.entities.snapshot()
+            if snapshot is not None:
+                version, entities = snapshot
+                self.session.save_entities(entities)
+                self.context_store.entities.mark_saved(version)
+        except Exception:
+            logger.exception("Could not save session %s", self.session.id)
+    
+    def _process_turn(self, turn: int, query: str, on_token: Optional[Callable[[str], None]], use_cache: bool,
+                      cancel_event: Optional[threading.Event],
+                      on_progress: Callable[[str], None]) -> Tuple[str, Dict[str, Any]]:
+        self.add_message("user", query, turn)
+        on_progress("searching")
+        
+        # Spans from decoration tools are appended here when they land.
+        spans = []
+        tool_results = {"timings": spans}
+        query_span = Span("query")
+        started = time.monotonic()
+        submitted = []
+        
+        title = self.resolver.resolve(query) if self.resolver else None
+        if title:
+            tool_results["title"] = title.to_dict()
+        
+        for tool in self.tools.values():
+            tool_query = tool.build_query(query, title)
+            # Lookups started while the query was being typed are reused.
+            prefetched = self.prefetcher.take(tool.name, tool_query) if self.prefetcher and use_cache else None
+            self.add_message("assistant", f"Calling {tool.name}: {query}", turn)
+            submitted.append((tool, tool_query, self.executor.submit(
+                self._timed_search, tool, tool_query, spans, use_cache, prefetched
+            )))
+        if self.prefetcher:
+            self.prefetcher.cancel()
+        
+        # Decoration tools (e.g. the trailer lookup) are off the critical path:
+        # their results are merged into the history whenever they land.
+        for tool, tool_query, future in submitted:
+            if tool.role == DECORATION:
+                self._attach_decoration(turn, query, tool, tool_query, future, tool_results, cancel_event)
+        
+        # Context tools are gathered in registration order so the history
+        # renders the same way regardless of which one returns first.
+        for tool, tool_query, future in submitted:
+            if tool.role != CONTEXT:
+                continue
+            remaining = started + tool.timeout - time.monotonic()
+            try:
+                results = self._await(future, max(remaining, 0), cancel_event)
+            except QueryCancelled:
+                for _, _, pending in submitted:
+                    pending.cancel()
+                raise
+            except FutureTimeoutError:
+                future.cancel()
+                results = self._timeout_result(tool, tool_query)
+            except Exception as e:
+                results = self._error_result(tool, tool_query, e)
+            self._record_tool_result(turn, query, tool, tool_query, results, tool_results)
+        
+        self._notify()
+        
+        with timed("context", spans) as span:
+            # Earlier results are ranked against the question and, when one
+            # was recognised, the canonical title it is about.
+            retrieval_query = f"{query} {title.search_text}" if title else query
+            context = self.context_store.build(turn, self.llm.context_budget(query), retrieval_query)
+            span.attrs["chars"] = len(context)
+            span.attrs["tokens"] = estimate_tokens(context)
         
-        if youtube_tool and youtube_results.get("results"):
-            trailer_info = youtube_results["results"][0]
-            trailer_message = f"Found Trailer for {query}: {trailer_info.get('link', '')}"
-            self.add_message("assistant", trailer_message)
+        if cancel_event is not None and cancel_event.is_set():
+            raise QueryCancelled()
+        on_progress("answering")
         
-        context = self.get_context_from_history()
+        usage = {}
+        with timed("llm", spans, model=self.llm.model) as span:
+            if on_token:
+                chunks = []
+                stream = self.llm.stream_response(query, context, usage=usage, use_cache=use_cache)
+                if cancel_event is not None:
+                    stream = self._read_cancellable(stream, cancel_event)
+                try:
+                    for chunk in stream:
+                        if cancel_event is not None and cancel_event.is_set():
+                            raise QueryCancelled()
+                        if not chunks:
+                            span.attrs["first_token_ms"] = round((time.perf_counter() - span.started) * 1000, 2)
+                        chunks.append(chunk)
+                        on_token(chunk)
+                finally:
+                    # Closing the stream ends the request to Groq.
+                    stream.close()
+                response = "".join(chunks)
+            elif cancel_event is not None:
+                response = self._await(self.executor.submit(
+                    self.llm.generate_response, query, context, usage=usage, use_cache=use_cache
+                ), None, cancel_event)
+            else:
+                response = self.llm.generate_response(query, context, usage=usage, use_cache=use_cache)
+            span.attrs.update(usage)
+        self.add_message("assistant", response, turn)
         
-        response = self.llm.generate_response(query, context)
-        self.add_message("assistant", response)
+        registry.record(query_span.finish())
+        spans.append(query_span.to_dict())
         
-        return response, tool_results
\ No newline at end of file
+        return response, tool_results
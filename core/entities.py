@@ -0,0 +1,234 @@
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from core.titles import normalize_title
+
+OMDB = "OMDB Search"
+DUCKDUCKGO = "DuckDuckGo Search"
+YOUTUBE = "YouTube Search"
+INDEX = "IMDb index"
+
+# Which source wins when two disagree about a field. A lower-ranked source
+# still replaces a value once that value is older than STALE_AFTER.
+SOURCE_RANK = {OMDB: 3, INDEX: 2, DUCKDUCKGO: 1, YOUTUBE: 1}
+STALE_AFTER = 7 * 24 * 3600
+
+ENTITY_FIELDS = (
+    ("rating", "IMDB Rating"),
+    ("released", "Released"),
+    ("genre", "Genre"),
+    ("director", "Director"),
+    ("cast", "Cast"),
+    ("plot", "Plot"),
+    ("imdb", "IMDB"),
+    ("trailer", "Trailer")
+)
+
+# Facts pulled from search snippets (core.extract) and the fields they fill.
+FACT_TO_FIELD = {"rating": "rating", "release_date": "released", "director": "director", "cast": "cast"}
+
+# "Dune: Part Two (2024) - IMDb", "Severance (TV Series 2022– ) - IMDb"
+RESULT_TITLE = re.compile(r"^(?P<title>[^()]+?)\s*\((?:[A-Za-z ]+ )?(?P<year>\d{4})")
+YEAR = re.compile(r"\d{4}")
+IMDB_ID = re.compile(r"tt\d+")
+
+def _year(value: Any) -> str:
+    match = YEAR.search(str(value or ""))
+    return match.group(0) if match else ""
+
+def _imdb_id(link: str) -> str:
+    match = IMDB_ID.search(link or "")
+    return match.group(0) if match else ""
+
+class Entity:
+    # One film; every field remembers its value, the tool it came from and
+    # when that tool reported it.
+    __slots__ = ("key", "fields", "turn")
+    
+    def __init__(self, key: str, turn: int = 0):
+        self.key = key
+        self.fields: Dict[str, Dict[str, Any]] = {}
+        self.turn = turn
+    
+    def get(self, field: str) -> str:
+        return self.fields[field]["value"] if field in self.fields else ""
+    
+    def set(self, field: str, value: Any, source: str, at: float) -> bool:
+        value = str(value or "").strip()
+        if not value or value == "N/A":
+            return False
+        current = self.fields.get(field)
+        if current is not None:
+            rank, current_rank = SOURCE_RANK.get(source, 0), SOURCE_RANK.get(current["source"], 0)
+            if value == current["value"]:
+                if rank >= current_rank:
+                    current["at"] = max(current["at"], at)
+                return False
+            stale = at - current["at"] > STALE_AFTER
+            if not stale and (rank < current_rank or (rank == current_rank and at < current["at"])):
+                return False
+        self.fields[field] = {"value": value, "source": source, "at": at}
+        return True
+    
+    @property
+    def updated(self) -> float:
+        return max((field["at"] for field in self.fields.values()), default=0.0)
+    
+    def render(self) -> str:
+        title = self.get("title") or self.key
+        year = self.get("year")
+        lines = [f"{title} ({year})" if year else title]
+        for field, label in ENTITY_FIELDS:
+            if field in self.fields:
+                lines.append(f"   {label}: {self.fields[field]['value']}")
+        sources = sorted({field["source"] for field in self.fields.values()})
+        lines.append(f"   Sources: {', '.join(sources)}; updated {time.strftime('%Y-%m-%d', time.localtime(self.updated))}")
+        return "\n".join(lines) + "\n"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"key": self.key, "turn": self.turn, "fields": {field: dict(value) for field, value in self.fields.items()}}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Entity":
+        entity = cls(data["key"], data.get("turn", 0))
+        entity.fields = data.get("fields", {})
+        return entity
+
+class EntityStore:
+    # Canonical movie records for one session, keyed by imdbID when known and
+    # by normalized title and year otherwise. Results from every tool are
+    # merged into them field by field as they arrive.
+    def __init__(self):
+        self.entities: Dict[str, Entity] = {}
+        self.aliases: Dict[str, str] = {}
+        # Bumped on every change; a snapshot only counts as saved once
+        # its write succeeded.
+        self.version = 0
+        self.saved_version = 0
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self.entities)
+    
+    @staticmethod
+    def _title_keys(title: str, year: str) -> List[str]:
+        name = normalize_title(title)
+        if not name:
+            return []
+        return [f"{name}|{year}", f"{name}|"] if year else [f"{name}|"]
+    
+    def _find(self, title: str, year: str, imdb_id: str) -> Optional[Entity]:
+        if imdb_id and imdb_id in self.aliases:
+            return self.entities[self.aliases[imdb_id]]
+        # The bare title is only a match when the year is unknown, and never
+        # for a record that already has a different imdbID.
+        keys = self._title_keys(title, year)
+        key = self.aliases.get(keys[0]) if keys else None
+        if key is None:
+            return None
+        entity = self.entities[key]
+        known = _imdb_id(entity.get("imdb"))
+        return None if imdb_id and known and known != imdb_id else entity
+    
+    def _entity(self, turn: int, title: str, year: Any = "", imdb_id: str = "") -> Optional[Entity]:
+        year = _year(year)
+        entity = self._find(title, year, imdb_id)
+        if entity is None:
+            keys = self._title_keys(title, year)
+            if not imdb_id and not keys:
+                return None
+            entity = self.entities.setdefault(imdb_id or keys[0], Entity(imdb_id or keys[0], turn))
+        # A bare title keeps pointing at the first film seen under it.
+        for alias in ([imdb_id] if imdb_id else []) + self._title_keys(title, year):
+            self.aliases.setdefault(alias, entity.key)
+        entity.turn = max(entity.turn, turn)
+        return entity
+    
+    def _merge(self, entity: Entity, values: Dict[str, Any], source: str, at: float):
+        for field, value in values.items():
+            if entity.set(field, value, source, at):
+                self.version += 1
+    
+    def ingest(self, turn: int, tool_name: str, results: List[Dict[str, Any]],
+               subject: Optional[Dict[str, Any]] = None, at: Optional[float] = None) -> Tuple[List[Entity], List[Dict[str, Any]]]:
+        # Returns the records touched and the results that did not belong to
+        # any film, which stay plain passages.
+        at = time.time() if at is None else at
+        touched: Dict[str, Entity] = {}
+        leftover = []
+        
+        with self._lock:
+            # The title the question resolved to; results that do not name
+            # a film of their own are about it.
+            about = None
+            if subject:
+                about = self._entity(turn, subject.get("title", ""), subject.get("year"), subject.get("imdbID", ""))
+                if about is not None:
+                    self._merge(about, {
+                        "title": subject.get("title"),
+                        "year": subject.get("year"),
+                        "imdb": f"https://www.imdb.com/title/{subject['imdbID']}" if subject.get("imdbID") else ""
+                    }, INDEX, at)
+                    touched[about.key] = about
+            
+            for result in results:
+                entity = None
+                if tool_name == OMDB:
+                    entity = self._entity(turn, result.get("title", ""), result.get("year"), _imdb_id(result.get("imdbLink", "")))
+                    if entity is not None:
+                        self._merge(entity, {
+                            "title": result.get("title"),
+                            "year": result.get("year"),
+                            "rating": result.get("rating"),
+                            "genre": result.get("genre"),
+                            "director": result.get("director"),
+                            "cast": result.get("actors"),
+                            "plot": result.get("plot"),
+                            "imdb": result.get("imdbLink") if _imdb_id(result.get("imdbLink", "")) else ""
+                        }, tool_name, at)
+                elif tool_name == DUCKDUCKGO and result.get("facts"):
+                    # A page naming a film with its year (a sequel, a remake)
+                    # is about that film rather than the resolved one.
+                    named = RESULT_TITLE.match(result.get("title", ""))
+                    if named and (about is None or named.group("year") != _year(about.get("year"))):
+                        entity = self._entity(turn, named.group("title"), named.group("year"))
+                        if entity is not None:
+                            self._merge(entity, {"title": named.group("title"), "year": named.group("year")}, tool_name, at)
+                    else:
+                        entity = about
+                    if entity is not None:
+                        self._merge(entity, {FACT_TO_FIELD[field]: value for field, value in result["facts"].items()}, tool_name, at)
+                elif tool_name == YOUTUBE and about is not None:
+                    entity = about
+                    self._merge(entity, {"trailer": result.get("link")}, tool_name, at)
+                
+                if entity is None:
+                    leftover.append(result)
+                else:
+                    touched[entity.key] = entity
+        return list(touched.values()), leftover
+    
+    def snapshot(self) -> Optional[Tuple[int, Dict[str, Any]]]:
+        # A copy taken under the lock, with the version it reflects; None
+        # when nothing changed since the last successful save.
+        with self._lock:
+            if self.version == self.saved_version:
+                return None
+            return self.version, {"entities": [entity.to_dict() for entity in self.entities.values()]}
+    
+    def mark_saved(self, version: int):
+        with self._lock:
+            self.saved_version = max(self.saved_version, version)
+    
+    def load(self, data: Optional[Dict[str, Any]]) -> List[Entity]:
+        loaded = []
+        with self._lock:
+            for record in (data or {}).get("entities", []):
+                entity = Entity.from_dict(record)
+                self.entities[entity.key] = entity
+                imdb_id = _imdb_id(entity.get("imdb"))
+                for alias in ([imdb_id] if imdb_id else []) + self._title_keys(entity.get("title"), _year(entity.get("year"))):
+                    self.aliases.setdefault(alias, entity.key)
+                loaded.append(entity)
+        return loaded
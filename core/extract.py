@@ -0,0 +1,53 @@
+import re
+from typing import Dict, Any, List
+
+# Every fact is one named alternative, so a snippet is scanned once and the
+# first match of each kind wins. Director and cast stop at the next clause
+# instead of running into each other.
+LETTER = r"[^\W\d_]"
+MONTH = r"(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|Aug(?:ust)?|Sept?(?:ember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\.?"
+
+FACT_PATTERN = re.compile(
+    r"(?P<rating>\d+(?:\.\d+)?/10)"
+    rf"|(?P<release_date>[Rr]eleased on {MONTH} \d+, \d{{4}}|\d{{1,2}} {MONTH} \d{{4}})"
+    rf"|[Dd]irected by (?P<director>(?:{LETTER}| )+?)(?= starring\b| and\b| with\b|[^\w ]|\d|$)"
+    rf"|[Ss]tarring (?P<cast>(?:{LETTER}|[ ,])+?)(?= and more\b|[^\w ,]|\d|$)"
+)
+
+FACT_FIELDS = ("rating", "release_date", "director", "cast")
+
+def extract_facts(snippet: str) -> Dict[str, str]:
+    facts = {}
+    for match in FACT_PATTERN.finditer(snippet):
+        field = match.lastgroup
+        if field not in facts:
+            facts[field] = match.group(field).strip()
+            if len(facts) == len(FACT_FIELDS):
+                break
+    # A bare "x/10" only counts as a rating, and a date as the release
+    # date, when the snippet says so.
+    lowered = snippet.lower()
+    if "rating" in facts and "rating" not in lowered:
+        del facts["rating"]
+    if "release_date" in facts and "release" not in lowered:
+        del facts["release_date"]
+    return facts
+
+def merge_facts(results: List[Dict[str, Any]]) -> Dict[str, str]:
+    merged = {}
+    for result in results:
+        for field, value in result.get("facts", {}).items():
+            merged.setdefault(field, value)
+    if merged and results:
+        merged["title"] = results[0].get("title", "").split(" - ")[0]
+    return merged
+
+def attach_facts(tool_name: str, results: Dict[str, Any]):
+    # Runs once when a result is stored; the display and the context read
+    # the fields from the entry afterwards.
+    if tool_name != "DuckDuckGo Search" or "facts" in results:
+        return
+    items = results.get("results", [])
+    for item in items:
+        item["facts"] = extract_facts(item.get("snippet", ""))
+    results["facts"] = merge_facts(items)
@@ -0,0 +1,267 @@
+import json
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from typing import Dict, Any, Iterator, List, Optional
+
+class HistoryEntry:
+    __slots__ = ("role", "content", "tool", "query", "results", "created")
+    
+    def __init__(self, role: str, content: Optional[str] = None, tool: Optional[str] = None,
+                 query: Optional[str] = None, results: Optional[Dict[str, Any]] = None,
+                 created: Optional[float] = None):
+        self.role = sys.intern(role)
+        self.content = content
+        self.tool = sys.intern(tool) if tool else None
+        self.query = query
+        self.results = results
+        self.created = time.time() if created is None else created
+    
+    # Mapping-style access keeps the render and context code that treats
+    # entries as dicts working unchanged.
+    def __getitem__(self, key: str) -> Any:
+        if key == "timestamp":
+            return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.created))
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        if value is None:
+            raise KeyError(key)
+        return value
+    
+    def __contains__(self, key: str) -> bool:
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__ if getattr(self, slot) is not None}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HistoryEntry":
+        return cls(**{key: value for key, value in data.items() if key in cls.__slots__})
+
+def tool_key(tool: str, query: str) -> str:
+    return f"{tool}\x1f{query}".replace("\t", " ").replace("\n", " ")
+
+class HistoryLog:
+    # Append-only JSON Lines file; entry i is line i, located through an
+    # in-memory array of byte offsets. With an index file every append also
+    # records "offset\trole\tkey", so reopening a long log never has to
+    # parse it, and a crash between the two writes is repaired on open.
+    def __init__(self, path: str, index_path: Optional[str] = None):
+        self.path = path
+        self.index_path = index_path
+        self.offsets = array("Q")
+        self.roles: List[str] = []
+        self.keys: Dict[str, int] = {}
+        self._writer = None
+        self._index = None
+        self._reader = None
+        self._lock = threading.Lock()
+        if index_path and os.path.exists(path):
+            self._recover()
+    
+    def __len__(self) -> int:
+        return len(self.offsets)
+    
+    @staticmethod
+    def _entry_key(entry: HistoryEntry) -> str:
+        # Only successful tool lookups are worth reusing.
+        results = entry.results or {}
+        if entry.role == "tool" and results.get("results") and not results.get("error"):
+            return tool_key(entry.tool, entry.query or "")
+        return ""
+    
+    def _register(self, offset: int, role: str, key: str):
+        if key:
+            self.keys[key] = len(self.offsets)
+        self.offsets.append(offset)
+        self.roles.append(sys.intern(role))
+    
+    def _recover(self):
+        size = os.path.getsize(self.path)
+        lines = []
+        data = b""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as handle:
+                data = handle.read()
+        for line in data.split(b"\n")[:-1]:
+            fields = line.split(b"\t")
+            try:
+                offset = int(fields[0])
+            except ValueError:
+                break
+            if offset >= size or len(fields) != 3:
+                break
+            self._register(offset, fields[1].decode("utf-8"), fields[2].decode("utf-8"))
+            lines.append(line + b"\n")
+        
+        with open(self.path, "rb+") as handle:
+            end = 0
+            if self.offsets:
+                handle.seek(self.offsets[-1])
+                line = handle.readline()
+                if line.endswith(b"\n"):
+                    end = self.offsets[-1] + len(line)
+                else:
+                    end = self.offsets.pop()
+                    self.roles.pop()
+                    lines.pop()
+                    self.keys = {key: index for key, index in self.keys.items() if index < len(self.offsets)}
+            
+            # Entries that reached the log but not the index, up to the first
+            # torn line, are re-indexed; anything after that is cut off.
+            handle.seek(end)
+            while True:
+                line = handle.readline()
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = HistoryEntry.from_dict(json.loads(line))
+                except ValueError:
+                    break
+                key = self._entry_key(entry)
+                self._register(end, entry.role, key)
+                lines.append(f"{end}\t{entry.role}\t{key}\n".encode("utf-8"))
+                end += len(line)
+            if end < size:
+                handle.truncate(end)
+        
+        index = b"".join(lines)
+        if index != data:
+            with open(self.index_path + ".tmp", "wb") as handle:
+                handle.write(index)
+            os.replace(self.index_path + ".tmp", self.index_path)
+    
+    def append(self, entry: HistoryEntry) -> int:
+        line = (json.dumps(entry.to_dict(), separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            if self._writer is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._writer = open(self.path, "ab")
+                if self.index_path:
+                    self._index = open(self.index_path, "ab")
+            offset = self._writer.tell()
+            self._writer.write(line)
+            self._writer.flush()
+            key = self._entry_key(entry)
+            if self._index is not None:
+                self._index.write(f"{offset}\t{entry.role}\t{key}\n".encode("utf-8"))
+                self._index.flush()
+            self._register(offset, entry.role, key)
+            return len(self.offsets) - 1
+    
+    def read(self, index: int) -> HistoryEntry:
+        with self._lock:
+            if self._reader is None:
+                self._reader = open(self.path, "rb")
+            self._reader.seek(self.offsets[index])
+            line = self._reader.readline()
+        return HistoryEntry.from_dict(json.loads(line))
+    
+    def sync(self):
+        with self._lock:
+            for handle in (self._writer, self._index):
+                if handle is not None:
+                    handle.flush()
+                    os.fsync(handle.fileno())
+    
+    def close(self):
+        with self._lock:
+            for handle in (self._writer, self._index, self._reader):
+                if handle is not None:
+                    handle.close()
+            self._writer = self._index = self._reader = None
+
+class ConversationHistory:
+    # List-like history that keeps only the newest `window` entries in memory.
+    # Older entries are spilled to a HistoryLog and paged back in on demand.
+    # Given an existing log (a saved session) every entry is written through
+    # as it is appended and the log already holds everything that came before.
+    PAGE_CACHE_SIZE = 256
+    
+    def __init__(self, window: int = 1000, log_path: Optional[str] = None, log: Optional[HistoryLog] = None):
+        self.window = window
+        self.log_path = log_path
+        self.write_through = log is not None
+        self._log: Optional[HistoryLog] = log
+        self._recent = deque()
+        self._spilled = len(log) if log is not None else 0
+        self._paged = OrderedDict()
+        self._lock = threading.RLock()
+    
+    def __len__(self) -> int:
+        return self._spilled + len(self._recent)
+    
+    def append(self, entry: HistoryEntry):
+        with self._lock:
+            if self.write_through:
+                self._log.append(entry)
+            self._recent.append(entry)
+            while len(self._recent) > self.window and (self.write_through or self.log_path):
+                if self._log is None:
+                    self._log = HistoryLog(self.log_path)
+                spilled = self._recent.popleft()
+                if not self.write_through:
+                    self._log.append(spilled)
+                self._spilled += 1
+    
+    def load_tail(self, count: int):
+        # Reads the newest `count` logged entries back into memory.
+        with self._lock:
+            count = min(count, self._spilled, self.window - len(self._recent))
+            for index in range(self._spilled - 1, self._spilled - count - 1, -1):
+                self._recent.appendleft(self._log.read(index))
+            self._spilled -= count
+    
+    def role(self, index: int) -> str:
+        # Answered from the log's index for spilled entries, so walking turn
+        # boundaries never pages whole entries in.
+        with self._lock:
+            if index >= self._spilled:
+                return self._recent[index - self._spilled].role
+            return self._log.roles[index]
+    
+    def find_tool_result(self, tool: str, query: str) -> Optional[HistoryEntry]:
+        with self._lock:
+            if self._log is None:
+                return None
+            index = self._log.keys.get(tool_key(tool, query))
+            return None if index is None else self[index]
+    
+    def __getitem__(self, index: int) -> HistoryEntry:
+        with self._lock:
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError("history index out of range")
+            if index >= self._spilled:
+                return self._recent[index - self._spilled]
+            
+            entry = self._paged.get(index)
+            if entry is None:
+                entry = self._log.read(index)
+                self._paged[index] = entry
+                if len(self._paged) > self.PAGE_CACHE_SIZE:
+                    self._paged.popitem(last=False)
+            else:
+                self._paged.move_to_end(index)
+            return entry
+    
+    def __iter__(self) -> Iterator[HistoryEntry]:
+        for index in range(len(self)):
+            yield self[index]
+    
+    def recent(self) -> Iterator[HistoryEntry]:
+        with self._lock:
+            return iter(list(self._recent))
@@ -0,0 +1,21 @@
+import threading
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session() -> "requests.Session":
+    # One keep-alive session for the whole process so repeated calls to the
+    # same API reuse pooled TCP/TLS connections instead of reconnecting.
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
@@ -0,0 +1,109 @@
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+from core.conversation import QueryCancelled
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+FINISHED = (DONE, CANCELLED, FAILED)
+
+class QueryJob:
+    def __init__(self, job_id: int, query: str):
+        self.id = job_id
+        self.query = query
+        self.state = QUEUED
+        self.stage = ""
+        self.response: Optional[str] = None
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+        # The conversation turn the query was recorded under, once started.
+        self.turn: Optional[int] = None
+        self.created = time.time()
+        self.finished: Optional[float] = None
+    
+    @property
+    def status(self) -> str:
+        return f"{self.state} · {self.stage}" if self.state == RUNNING and self.stage else self.state
+
+class QueryQueue:
+    # Questions wait here for one of a fixed set of worker threads. A queued
+    # job that is cancelled never starts; a running one stops at its next
+    # checkpoint and abandons the tool and LLM calls it was waiting on.
+    def __init__(self, run: Callable[[QueryJob], str], workers: int = 2,
+                 on_change: Optional[Callable[[QueryJob], None]] = None, keep_finished: int = 50):
+        self.run = run
+        self.on_change = on_change or (lambda job: None)
+        self.keep_finished = keep_finished
+        self.jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.workers = [
+            threading.Thread(target=self._work, name=f"query-{index}", daemon=True) for index in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+    
+    def submit(self, query: str) -> QueryJob:
+        with self._lock:
+            job = QueryJob(next(self._ids), query)
+            self.jobs[job.id] = job
+            self._prune()
+        self._queue.put(job)
+        self.on_change(job)
+        return job
+    
+    def cancel(self, job_id: int):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.state in FINISHED:
+                return
+            job.cancel_event.set()
+            if job.state == QUEUED:
+                self._finish(job, CANCELLED)
+        self.on_change(job)
+    
+    def set_stage(self, job: QueryJob, stage: str):
+        job.stage = stage
+        self.on_change(job)
+    
+    def active(self) -> List[QueryJob]:
+        with self._lock:
+            return [job for job in self.jobs.values() if job.state not in FINISHED]
+    
+    def _finish(self, job: QueryJob, state: str):
+        job.state = state
+        job.finished = time.time()
+    
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.state in FINISHED]
+        for job_id in finished[:max(len(finished) - self.keep_finished, 0)]:
+            del self.jobs[job_id]
+    
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                if job.cancel_event.is_set():
+                    continue
+                job.state = RUNNING
+            self.on_change(job)
+            
+            try:
+                job.response = self.run(job)
+                state = DONE
+            except QueryCancelled:
+                state = CANCELLED
+            except Exception as e:
+                job.error = str(e)
+                state = FAILED
+            with self._lock:
+                self._finish(job, state)
+            self.on_change(job)
@@ -1,39 +1,249 @@
+import itertools
 import os
-from groq import Groq
-from typing import Optional
+import threading
+import time
+from typing import Optional, List, Dict, Iterator, Any
+from core.context import estimate_tokens
+from core.cache import ResponseCache, response_key
+from core.resilience import CircuitOpenError, RateLimitedError, classify, get_upstream
+from core.router import AUTO, ModelRouter
+from core.singleflight import CallAbandoned, SingleFlight
+
+SYSTEM_PROMPT = """You are a helpful research assistant who can help users find information about movies, TV shows, and other topics.
+            When providing information about movies or shows, include IMDB ratings, release dates, 
+            and other relevant details from the context if available.
+            Use today's date and use data from the context."""
+
+MODEL_CONTEXT_WINDOWS = {
+    "llama3-70b-8192": 8192,
+    "llama3-8b-8192": 8192,
+    "mixtral-8x7b-32768": 32768,
+    "gemma-7b-it": 8192
+}
+
+def _read_usage(usage: Any) -> Dict[str, int]:
+    if not usage:
+        return {}
+    fields = ("prompt_tokens", "completion_tokens", "total_tokens")
+    if isinstance(usage, dict):
+        return {field: usage[field] for field in fields if usage.get(field) is not None}
+    return {field: getattr(usage, field) for field in fields if getattr(usage, field, None) is not None}
 
 class LLMClient:
-    def __init__(self):
+    def __init__(self, response_cache: Optional[ResponseCache] = None):
         self.api_key = os.getenv("GROQ_API_KEY")
         
         if not self.api_key:
             raise ValueError("Groq API Key must be set in environment variables")
-            
-        self.client = Groq(api_key=self.api_key)
-        self.model = "llama3-70b-8192"
+        
+        # groq pulls in httpx and pydantic; import and build it on first use.
+        self._client = None
+        self._client_lock = threading.Lock()
+        # "auto" picks a model per request; see core.router.
+        self.model = AUTO
+        self.max_tokens = 1000
+        self.request_timeout = 60.0
+        self.response_cache = response_cache
+        # Identical requests made while one is already running wait for it
+        # instead of asking the model again.
+        self.flight = SingleFlight()
+        self.router = ModelRouter()
+        # In auto mode one model gets a single short attempt before the
+        # request moves on to the next candidate.
+        self.attempt_timeout = 20.0
+    
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from groq import Groq
+                    # Retries are left to the shared upstream policy.
+                    self._client = Groq(api_key=self.api_key, max_retries=0)
+        return self._client
+    
+    def warm(self):
+        self.client
     
     def set_model(self, model_name: str):
         self.model = model_name
     
-    def generate_response(self, prompt: str, context: Optional[str] = None) -> str:
+    def _reserved(self, prompt: str) -> int:
+        # Room for the completion, the fixed prompt parts and a margin for
+        # the tokenizer estimate being off.
+        return self.max_tokens + estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt) + 256
+    
+    def context_budget(self, prompt: str) -> int:
+        if self.model == AUTO:
+            window = self.router.window(prompt)
+        else:
+            window = MODEL_CONTEXT_WINDOWS.get(self.model, 8192)
+        return max(window - self._reserved(prompt), 0)
+    
+    def _models(self, prompt: str, context: Optional[str]) -> List[str]:
+        if self.model != AUTO:
+            return [self.model]
+        models = self.router.candidates(prompt, estimate_tokens(context or ""), self._reserved(prompt))
+        # Nothing fits: the largest window has the best chance.
+        return models or [max(MODEL_CONTEXT_WINDOWS, key=MODEL_CONTEXT_WINDOWS.get)]
+    
+    def _create(self, model: str, prompt: str, context: Optional[str], stream: bool = False):
+        request = {
+            "model": model,
+            "messages": self._build_messages(prompt, context),
+            "max_tokens": self.max_tokens
+        }
+        if stream:
+            request["stream"] = True
+        timeout, attempts = self.request_timeout, None
+        if self.model == AUTO:
+            timeout, attempts = self.attempt_timeout, 1
+            request["timeout"] = timeout
+        return get_upstream(f"groq:{model}").call(
+            lambda: self.client.chat.completions.create(**request), timeout, max_attempts=attempts
+        )
+    
+    def _failed(self, model: str, error: Exception) -> bool:
+        # Records the failure and says whether another model may take over.
+        if isinstance(error, (CircuitOpenError, RateLimitedError)):
+            self.router.record(model, failed=True, cooldown=True)
+            return True
+        retryable, throttled = classify(error)
+        timed_out = "timeout" in type(error).__name__.lower() or isinstance(error, TimeoutError)
+        self.router.record(model, failed=True, cooldown=throttled or timed_out)
+        return retryable
+    
+    def _build_messages(self, prompt: str, context: Optional[str] = None) -> List[Dict[str, str]]:
+        system_prompt = SYSTEM_PROMPT
+        
+        if context:
+            system_prompt += f"\n\nHere is additional context from searches:\n{context}"
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _cache_key(self, prompt: str, context: Optional[str], use_cache: bool) -> Optional[str]:
+        if not use_cache or self.response_cache is None:
+            return None
+        return response_key(self.model, SYSTEM_PROMPT, prompt, context)
+    
+    def _flight_key(self, prompt: str, context: Optional[str], key: Optional[str]) -> str:
+        return key or response_key(self.model, SYSTEM_PROMPT, prompt, context)
+    
+    def _complete(self, prompt: str, context: Optional[str], key: Optional[str],
+                  usage: Optional[Dict[str, int]]) -> str:
+        models = self._models(prompt, context)
+        for index, model in enumerate(models):
+            started = time.monotonic()
+            try:
+                response = self._create(model, prompt, context)
+            except Exception as e:
+                if self._failed(model, e) and index + 1 < len(models):
+                    continue
+                raise
+            self.router.record(model, time.monotonic() - started)
+            break
+        
+        if usage is not None:
+            usage["model"] = model
+            usage.update(_read_usage(response.usage))
+        content = response.choices[0].message.content
+        if key and content:
+            self.response_cache.put(key, content)
+        return content
+    
+    def generate_response(self, prompt: str, context: Optional[str] = None,
+                          usage: Optional[Dict[str, int]] = None, use_cache: bool = True) -> str:
+        key = self._cache_key(prompt, context, use_cache)
+        if key:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                if usage is not None:
+                    usage["cached"] = 1
+                return cached
+        
         try:
-            system_prompt = """You are a helpful research assistant who can help users find information about movies, TV shows, and other topics.
-            When providing information about movies or shows, include IMDB ratings, release dates, 
-            and other relevant details from the context if available.
-            Use today's date and use data from the context."""
-            
-            if context:
-                system_prompt += f"\n\nHere is additional context from searches:\n{context}"
+            return self.flight.do(self._flight_key(prompt, context, key),
+                                  lambda: self._complete(prompt, context, key, usage),
+                                  timeout=self.request_timeout)
+        except Exception as e:
+            return f"Error generating response: {str(e)}"
+    
+    def stream_response(self, prompt: str, context: Optional[str] = None,
+                        usage: Optional[Dict[str, int]] = None, use_cache: bool = True) -> Iterator[str]:
+        key = self._cache_key(prompt, context, use_cache)
+        if key:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                if usage is not None:
+                    usage["cached"] = 1
+                yield cached
+                return
+        
+        # A stream for a request that is already running elsewhere waits for
+        # that response and yields it whole. If that stream is closed early,
+        # one of the waiters takes over and asks the model itself.
+        flight_key = self._flight_key(prompt, context, key)
+        call, leader = self.flight.begin(flight_key)
+        while not leader:
+            try:
+                result = self.flight.wait(call, self.request_timeout)
+            except CallAbandoned:
+                call, leader = self.flight.begin(flight_key)
+                continue
+            except Exception as e:
+                result = f"Error generating response: {str(e)}"
+            yield result
+            return
+        
+        chunks = []
+        stream = None
+        # Left in place only when the caller stops reading early.
+        error = CallAbandoned("The shared response stream was closed early")
+        try:
+            # Opening the stream and waiting for its first chunk may fail over
+            # to another model; once tokens have been shown a failure ends
+            # the response.
+            models = self._models(prompt, context)
+            for index, model in enumerate(models):
+                started = time.monotonic()
+                try:
+                    stream = self._create(model, prompt, context, stream=True)
+                    pending = iter(stream)
+                    first = next(pending, None)
+                except Exception as e:
+                    if stream is not None and hasattr(stream, "close"):
+                        stream.close()
+                    stream = None
+                    if self._failed(model, e) and index + 1 < len(models):
+                        continue
+                    raise
+                break
+            if usage is not None:
+                usage["model"] = model
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1000
-            )
+            for chunk in itertools.chain([] if first is None else [first], pending):
+                if chunk.choices and chunk.choices[0].delta.content:
+                    chunks.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+                # Groq reports token usage on the final chunk under x_groq.
+                x_groq = getattr(chunk, "x_groq", None)
+                if usage is not None and x_groq:
+                    usage.update(_read_usage(x_groq.get("usage") if isinstance(x_groq, dict) else getattr(x_groq, "usage", None)))
+            self.router.record(model, time.monotonic() - started)
             
-            return response.choices[0].message.content
+            error = None
+            if key and chunks:
+                self.response_cache.put(key, "".join(chunks))
         except Exception as e:
-            return f"Error generating response: {str(e)}"
\ No newline at end of file
+            error = e
+            self.flight.finish(flight_key, call, error=e)
+            yield f"Error generating response: {str(e)}"
+        finally:
+            # Also reached when the caller stops reading early (a cancelled
+            # query); closing the stream drops the connection to Groq.
+            if stream is not None and hasattr(stream, "close"):
+                stream.close()
+            self.flight.finish(flight_key, call, "".join(chunks), error)
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+class Span:
+    __slots__ = ("name", "started", "duration", "attrs")
+    
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.attrs: Dict[str, Any] = attrs
+    
+    def finish(self) -> "Span":
+        self.duration = time.perf_counter() - self.started
+        return self
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "ms": round(self.duration * 1000, 2), **self.attrs}
+
+class MetricsRegistry:
+    def __init__(self, max_samples: int = 2000):
+        self.max_samples = max_samples
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, span: Span):
+        with self._lock:
+            samples = self._samples.get(span.name)
+            if samples is None:
+                samples = self._samples[span.name] = deque(maxlen=self.max_samples)
+            samples.append(span.duration)
+    
+    def percentiles(self, points=(50, 90, 99)) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+        
+        summary = {}
+        for name, samples in snapshot.items():
+            if not samples:
+                continue
+            stats = {"count": len(samples)}
+            for point in points:
+                rank = max(int(round(point / 100 * len(samples))) - 1, 0)
+                stats[f"p{point}_ms"] = round(samples[rank] * 1000, 2)
+            summary[name] = stats
+        return summary
+    
+    def dump(self) -> str:
+        lines = []
+        for name, stats in sorted(self.percentiles().items()):
+            values = "  ".join(f"{key}={value}" for key, value in stats.items())
+            lines.append(f"{name:<28} {values}")
+        return "\n".join(lines)
+    
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+registry = MetricsRegistry()
+
+class timed:
+    # Context manager that times a block, records it in the registry and, if
+    # given a list, appends the finished span there as a plain dict.
+    def __init__(self, name: str, spans: Optional[List[Dict[str, Any]]] = None, **attrs):
+        self.span = Span(name, **attrs)
+        self.spans = spans
+    
+    def __enter__(self) -> Span:
+        self.span.started = time.perf_counter()
+        return self.span
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.span.finish()
+        if exc_type is not None:
+            self.span.attrs["error"] = exc_type.__name__
+        registry.record(self.span)
+        if self.spans is not None:
+            self.spans.append(self.span.to_dict())
+        return False
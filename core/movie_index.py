@@ -0,0 +1,266 @@
+import argparse
+import csv
+import gzip
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Any, List, Optional, Iterator
+from core.search import IMDB_ID, SearchTool
+from core.paths import data_path
+from core.titles import QUESTION_WORDS, Title, TitleResolver, normalize_title
+
+DEFAULT_INDEX_PATH = "movies.sqlite3"
+
+# Episodes and shorts make up most of the IMDb dump but are never what a user
+# asks about, so they are left out of the index.
+TITLE_TYPES = {"movie", "tvMovie", "tvSeries", "tvMiniSeries", "tvSpecial"}
+
+FILLER_WORDS = {"movie", "movies", "film", "films", "series", "show", "tv", "trailer", "imdb"}
+
+def _open_tsv(directory: str, name: str) -> Optional[Iterator[List[str]]]:
+    for filename in (f"{name}.tsv.gz", f"{name}.tsv"):
+        path = os.path.join(directory, filename)
+        if os.path.exists(path):
+            handle = gzip.open(path, "rt", encoding="utf-8") if filename.endswith(".gz") else open(path, encoding="utf-8")
+            reader = csv.reader(handle, delimiter="\t", quoting=csv.QUOTE_NONE)
+            next(reader, None)
+            return reader
+    return None
+
+def _value(field: str) -> Optional[str]:
+    return None if field == "\\N" else field
+
+def ingest(directory: str, path: str, min_votes: int = 0, log=print):
+    # IMDb-style dumps: title.basics is required; ratings, crew, principals
+    # and name.basics fill in the remaining columns when present.
+    basics = _open_tsv(directory, "title.basics")
+    if basics is None:
+        raise FileNotFoundError(f"title.basics.tsv(.gz) not found in {directory}")
+    
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executescript("""
+        CREATE TABLE basics (tconst TEXT PRIMARY KEY, title TEXT, title_key TEXT, year INTEGER, type TEXT, genres TEXT);
+        CREATE TABLE ratings (tconst TEXT PRIMARY KEY, rating REAL, votes INTEGER);
+        CREATE TABLE directors (tconst TEXT, ordering INTEGER, nconst TEXT);
+        CREATE TABLE principals (tconst TEXT, ordering INTEGER, nconst TEXT);
+        CREATE TABLE names (nconst TEXT PRIMARY KEY, name TEXT);
+    """)
+    
+    started = time.monotonic()
+    rows = (
+        (row[0], row[2], normalize_title(row[2]), _value(row[5]), row[1], _value(row[8]))
+        for row in basics if row[1] in TITLE_TYPES and row[4] == "0"
+    )
+    conn.executemany("INSERT OR IGNORE INTO basics VALUES (?, ?, ?, ?, ?, ?)", rows)
+    log(f"titles loaded in {time.monotonic() - started:.1f}s")
+    
+    ratings = _open_tsv(directory, "title.ratings")
+    if ratings is not None:
+        conn.executemany("INSERT OR IGNORE INTO ratings VALUES (?, ?, ?)", ((r[0], r[1], r[2]) for r in ratings))
+        log(f"ratings loaded in {time.monotonic() - started:.1f}s")
+    
+    crew = _open_tsv(directory, "title.crew")
+    if crew is not None:
+        rows = (
+            (row[0], ordering, nconst)
+            for row in crew if row[1] != "\\N"
+            for ordering, nconst in enumerate(row[1].split(",")[:3])
+        )
+        conn.executemany("INSERT INTO directors VALUES (?, ?, ?)", rows)
+        log(f"crew loaded in {time.monotonic() - started:.1f}s")
+    
+    principals = _open_tsv(directory, "title.principals")
+    if principals is not None:
+        rows = (
+            (row[0], int(row[1]), row[2])
+            for row in principals if row[3] in ("actor", "actress") and int(row[1]) <= 10
+        )
+        conn.executemany("INSERT INTO principals VALUES (?, ?, ?)", rows)
+        log(f"principals loaded in {time.monotonic() - started:.1f}s")
+    
+    names = _open_tsv(directory, "name.basics")
+    if names is not None:
+        conn.executemany("INSERT OR IGNORE INTO names VALUES (?, ?)", ((r[0], r[1]) for r in names))
+        log(f"names loaded in {time.monotonic() - started:.1f}s")
+    
+    conn.executescript("""
+        CREATE INDEX directors_tconst ON directors (tconst, ordering);
+        CREATE INDEX principals_tconst ON principals (tconst, ordering);
+        CREATE TABLE titles (
+            imdb_id TEXT PRIMARY KEY, title TEXT NOT NULL, title_key TEXT NOT NULL, year INTEGER,
+            type TEXT, genres TEXT, rating REAL, votes INTEGER, directors TEXT, actors TEXT
+        );
+    """)
+    conn.execute("""
+        INSERT INTO titles
+        SELECT b.tconst, b.title, b.title_key, b.year, b.type, b.genres, r.rating, COALESCE(r.votes, 0),
+            (SELECT group_concat(n.name, ', ') FROM
+                (SELECT nconst FROM directors d WHERE d.tconst = b.tconst ORDER BY d.ordering) x
+                JOIN names n ON n.nconst = x.nconst),
+            (SELECT group_concat(n.name, ', ') FROM
+                (SELECT nconst FROM principals p WHERE p.tconst = b.tconst ORDER BY p.ordering LIMIT 4) x
+                JOIN names n ON n.nconst = x.nconst)
+        FROM basics b LEFT JOIN ratings r ON r.tconst = b.tconst
+        WHERE COALESCE(r.votes, 0) >= ?
+    """, (min_votes,))
+    conn.executescript("""
+        DROP TABLE basics; DROP TABLE ratings; DROP TABLE directors; DROP TABLE principals; DROP TABLE names;
+        CREATE INDEX titles_key ON titles (title_key, votes DESC);
+    """)
+    count = conn.execute("SELECT COUNT(*) FROM titles").fetchone()[0]
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, path)
+    log(f"indexed {count} titles into {path} in {time.monotonic() - started:.1f}s")
+
+class MovieIndex:
+    COLUMNS = "imdb_id, title, year, type, genres, rating, votes, directors, actors"
+    
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Movie index not found at {path}")
+        self.path = path
+        # Read-only connections, one per thread, so lookups never contend.
+        self._local = threading.local()
+    
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+    
+    def iter_titles(self, min_votes: int = 0) -> Iterator[Title]:
+        rows = self._conn().execute(
+            "SELECT title, year, imdb_id, votes FROM titles WHERE votes >= ?", (min_votes,)
+        )
+        for title, year, imdb_id, votes in rows:
+            yield Title(title, year, imdb_id, votes)
+    
+    def get(self, imdb_id: str) -> Optional[sqlite3.Row]:
+        return self._conn().execute(f"SELECT {self.COLUMNS} FROM titles WHERE imdb_id = ?", (imdb_id,)).fetchone()
+    
+    def lookup(self, query: str, limit: int = 3) -> List[sqlite3.Row]:
+        # Question words are trimmed from the ends the same way the title
+        # resolver does it, so "Who directed Inception" only looks up
+        # "inception".
+        text, year = TitleResolver.extract_title_text(query)
+        words = [word for word in text.split() if word not in FILLER_WORDS]
+        if not words:
+            return []
+        
+        # Every contiguous run of words that is not only question words is a
+        # candidate title. One indexed query covers them all.
+        candidates = {}
+        for start in range(len(words)):
+            for end in range(start + 1, min(start + 9, len(words)) + 1):
+                if all(word in QUESTION_WORDS for word in words[start:end]):
+                    continue
+                candidates.setdefault(" ".join(words[start:end]), end - start)
+        if not candidates:
+            return []
+        
+        placeholders = ", ".join("?" * len(candidates))
+        sql = f"SELECT {self.COLUMNS}, title_key FROM titles WHERE title_key IN ({placeholders})"
+        params = list(candidates)
+        if year:
+            sql += " AND year = ?"
+            params.append(year)
+        rows = self._conn().execute(sql, params).fetchall()
+        
+        # The longest match wins, then the most voted; only titles sharing
+        # that best key (remakes, same-named series) are returned with it.
+        rows.sort(key=lambda row: (candidates[row["title_key"]], row["votes"] or 0), reverse=True)
+        best_key = rows[0]["title_key"] if rows else None
+        return [row for row in rows if row["title_key"] == best_key][:limit]
+
+def format_title(row: sqlite3.Row) -> Dict[str, Any]:
+    # Same shape as an OMDBSearch result so the UI and context builder can
+    # treat both sources identically.
+    return {
+        "title": row["title"],
+        "year": str(row["year"] or ""),
+        "rating": str(row["rating"]) if row["rating"] is not None else "N/A",
+        "plot": "",
+        "director": row["directors"] or "",
+        "actors": row["actors"] or "",
+        "genre": (row["genres"] or "").replace(",", ", "),
+        "poster": "",
+        "imdbLink": f"https://www.imdb.com/title/{row['imdb_id']}"
+    }
+
+class LocalMovieSearch(SearchTool):
+    def __init__(self, index: MovieIndex, fallback: Optional[SearchTool] = None):
+        super().__init__("OMDB Search", "omdb", timeout=fallback.timeout if fallback else 5.0)
+        self.index = index
+        self.fallback = fallback
+        # Local lookups are cheaper than a cache round trip.
+        self.cacheable = False
+    
+    def build_query(self, query: str, title: Optional[Title] = None) -> str:
+        return title.imdb_id if title else query
+    
+    def warm(self):
+        self.index.get("")
+        if self.fallback is not None:
+            self.fallback.warm()
+    
+    def search(self, query: str) -> Dict[str, Any]:
+        try:
+            if IMDB_ID.match(query):
+                row = self.index.get(query)
+                rows = [row] if row else []
+            else:
+                rows = self.index.lookup(query)
+        except sqlite3.Error as e:
+            rows = []
+            if self.fallback is None:
+                return {"tool": self.name, "query": query, "error": str(e), "results": []}
+        
+        if not rows and self.fallback is not None:
+            return self.fallback.search(query)
+        
+        return {
+            "tool": self.name,
+            "query": query,
+            "source": "local",
+            "results": [format_title(row) for row in rows]
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the offline movie index.")
+    parser.add_argument("--db", default=None, help="index path (defaults to the data directory)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    ingest_parser = subparsers.add_parser("ingest", help="load IMDb-style TSV dumps from a directory")
+    ingest_parser.add_argument("directory")
+    ingest_parser.add_argument("--min-votes", type=int, default=0, help="skip titles with fewer votes")
+    
+    lookup_parser = subparsers.add_parser("lookup", help="look up a title in the index")
+    lookup_parser.add_argument("query")
+    
+    args = parser.parse_args()
+    path = args.db or data_path(DEFAULT_INDEX_PATH)
+    
+    if args.command == "ingest":
+        ingest(args.directory, path, min_votes=args.min_votes)
+    else:
+        index = MovieIndex(path)
+        started = time.perf_counter()
+        rows = index.lookup(args.query)
+        elapsed = (time.perf_counter() - started) * 1e6
+        for row in rows:
+            print(format_title(row))
+        print(f"{len(rows)} results in {elapsed:.0f}us", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
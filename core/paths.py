@@ -0,0 +1,11 @@
+import os
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Caches, indexes and session logs live here unless MRA_DATA_DIR overrides it.
+DATA_DIR = os.getenv("MRA_DATA_DIR") or os.path.join(PROJECT_DIR, "data")
+
+def data_path(*parts: str) -> str:
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -0,0 +1,86 @@
+import os
+from typing import Callable, List, Optional
+from core.search import SearchTool, DuckDuckGoSearch, OMDBSearch, YouTubeSearch
+from core.cache import SearchCache, CachedSearchTool, ResponseCache
+from core.singleflight import CoalescingSearchTool, SingleFlight
+from core.llm import LLMClient
+from core.movie_index import DEFAULT_INDEX_PATH, LocalMovieSearch, MovieIndex
+from core.titles import BackgroundResolver
+from core.paths import data_path
+
+# Results are cached on disk; trailers change rarely and YouTube quota is the
+# scarcest, so they are kept the longest.
+SEARCH_CACHE_TTLS = {"search": 24 * 3600, "omdb": 7 * 24 * 3600, "youtube": 7 * 24 * 3600}
+
+RESOLVER_MIN_VOTES = 1000
+
+_search_cache = None
+_response_cache = None
+_search_flight = None
+
+def get_search_cache() -> SearchCache:
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SearchCache(data_path("search_cache.sqlite3"))
+    return _search_cache
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(path=data_path("response_cache.sqlite3"))
+    return _response_cache
+
+def get_search_flight() -> SingleFlight:
+    global _search_flight
+    if _search_flight is None:
+        _search_flight = SingleFlight()
+    return _search_flight
+
+def build_llm() -> LLMClient:
+    return LLMClient(response_cache=get_response_cache())
+
+def build_resolver() -> Optional[BackgroundResolver]:
+    # Popular titles from the offline index feed the fuzzy title resolver.
+    index_path = data_path(DEFAULT_INDEX_PATH)
+    if not os.path.exists(index_path):
+        return None
+    return BackgroundResolver(lambda: MovieIndex(index_path).iter_titles(min_votes=RESOLVER_MIN_VOTES))
+
+def cached_tool(tool: SearchTool, cache: SearchCache) -> SearchTool:
+    if not tool.cacheable:
+        return tool
+    return CachedSearchTool(tool, cache, SEARCH_CACHE_TTLS.get(tool.key, 24 * 3600))
+
+def build_tools(on_warning: Callable[[str], None], cache: Optional[SearchCache] = None) -> List[SearchTool]:
+    # Initialize all search tools
+    tools = [DuckDuckGoSearch()]
+    
+    # # Try to initialize OMDB API tool
+    # try:
+    #     tools.append(OMDBSearch())
+    # except ValueError as e:
+    #     on_warning(f"OMDB API: {str(e)}")
+    
+    # Try to initialize YouTube API tool
+    try:
+        tools.append(YouTubeSearch())
+    except ValueError as e:
+        on_warning(f"YouTube API: {str(e)}")
+    
+    cache = cache or get_search_cache()
+    tools = [cached_tool(tool, cache) for tool in tools]
+    
+    # With an offline index built by `python -m core.movie_index ingest`,
+    # title lookups are answered locally and OMDB is only a fallback.
+    index_path = data_path(DEFAULT_INDEX_PATH)
+    if os.path.exists(index_path):
+        try:
+            fallback = cached_tool(OMDBSearch(), cache)
+        except ValueError:
+            fallback = None
+        tools.insert(1, LocalMovieSearch(MovieIndex(index_path), fallback))
+    
+    # Outermost, so callers racing on the same query also share the cache
+    # lookup and write.
+    flight = get_search_flight()
+    return [CoalescingSearchTool(tool, flight) for tool in tools]
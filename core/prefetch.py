@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from core.search import SearchTool
+
+class Prefetcher:
+    # Starts the cacheable searches for a query while it is still being
+    # typed, as soon as the text resolves to a known title. The LLM call is
+    # never made here; process_query picks the lookups up on submit.
+    def __init__(self, tools: List[SearchTool], resolver, max_per_minute: int = 30, max_workers: int = 2):
+        self.tools = [tool for tool in tools if tool.cacheable]
+        self.resolver = resolver
+        self.max_per_minute = max_per_minute
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        # Each pending lookup with the flag that tells it not to start.
+        self.pending: Dict[Tuple[str, str], Tuple[Future, threading.Event]] = {}
+        self.started = deque()
+        self.counters = {"started": 0, "used": 0, "cancelled": 0, "capped": 0}
+        self._title_key = None
+        self._lock = threading.Lock()
+    
+    def prefetch(self, text: str):
+        title = self.resolver.resolve(text) if self.resolver and text.strip() else None
+        if title is None:
+            self.cancel()
+            return
+        title_key = title.imdb_id or title.search_text
+        
+        with self._lock:
+            if title_key == self._title_key:
+                return
+            self._cancel_pending()
+            self._title_key = title_key
+            
+            now = time.monotonic()
+            while self.started and now - self.started[0] > 60:
+                self.started.popleft()
+            for tool in self.tools:
+                # Protects API quotas when the resolver keeps changing its mind.
+                if len(self.started) >= self.max_per_minute:
+                    self.counters["capped"] += 1
+                    continue
+                self.started.append(now)
+                self.counters["started"] += 1
+                tool_query = tool.build_query(text, title)
+                cancelled = threading.Event()
+                self.pending[(tool.name, tool_query)] = (self.executor.submit(self._run, cancelled, tool, tool_query), cancelled)
+    
+    def _run(self, cancelled: threading.Event, tool: SearchTool, tool_query: str) -> Optional[Dict[str, Any]]:
+        # Jobs queued behind a newer prefetch never reach the upstream; a job
+        # that was taken is no longer pending and always runs.
+        if cancelled.is_set():
+            return None
+        return tool.search(tool_query)
+    
+    def _cancel_pending(self):
+        for future, cancelled in self.pending.values():
+            cancelled.set()
+            if future.cancel():
+                self.counters["cancelled"] += 1
+        self.pending.clear()
+        self._title_key = None
+    
+    def cancel(self):
+        with self._lock:
+            self._cancel_pending()
+    
+    def take(self, tool_name: str, tool_query: str) -> Optional[Future]:
+        with self._lock:
+            future, _ = self.pending.pop((tool_name, tool_query), (None, None))
+            if future is None or future.cancelled():
+                return None
+            self.counters["used"] += 1
+            return future
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
@@ -0,0 +1,235 @@
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Requests per second and burst size each upstream starts with. The rate is
+# halved whenever the upstream answers 429 and creeps back up on success.
+UPSTREAM_LIMITS = {
+    "duckduckgo": (1.0, 3),
+    "omdb": (5.0, 10),
+    "youtube": (5.0, 10),
+    "groq": (0.5, 5)
+}
+
+# Clients that already retry on their own (DDGS retries three times) get a
+# single attempt here, the way Groq runs with max_retries=0.
+UPSTREAM_ATTEMPTS = {
+    "duckduckgo": 1
+}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    pass
+
+class RateLimitedError(Exception):
+    pass
+
+def _status_code(error: Exception) -> Optional[int]:
+    # requests/httpx/groq errors carry the response (or its status) along;
+    # googleapiclient's HttpError keeps it on .resp.
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "resp", None), "status", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def classify(error: Exception) -> Tuple[bool, bool]:
+    # Returns (retryable, throttled).
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status == 408 or status >= 500, status == 429
+    
+    name = type(error).__name__.lower()
+    throttled = "ratelimit" in name
+    transient = isinstance(error, (TimeoutError, ConnectionError)) or any(
+        word in name for word in ("timeout", "connect", "remoteprotocol", "httperror")
+    )
+    return throttled or transient, throttled
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.max_rate = rate
+        self.min_rate = rate / 16
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, deadline: float) -> bool:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+    
+    def throttle(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+    
+    def recover(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+class CircuitBreaker:
+    # Opens after `failure_threshold` consecutive transient failures and
+    # fails fast until `reset_timeout` has passed; then a single probe call
+    # decides whether it closes again.
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+    
+    def retry_in(self) -> float:
+        with self._lock:
+            return max(self.reset_timeout - (time.monotonic() - self.opened_at), 0.0)
+    
+    def release(self):
+        # The call allowed through never reached the upstream.
+        with self._lock:
+            self._probing = False
+    
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+class Upstream:
+    def __init__(self, name: str, rate: float, burst: int, max_attempts: int = 3,
+                 base_delay: float = 0.5, max_delay: float = 8.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.counters = {"calls": 0, "successes": 0, "failures": 0, "retries": 0, "throttled": 0, "rejected": 0}
+        self._lock = threading.Lock()
+    
+    def _count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+    
+    def call(self, fn: Callable[[], Any], timeout: float, max_attempts: Optional[int] = None) -> Any:
+        # Runs fn, retrying transient failures with jittered exponential
+        # backoff for as long as the next attempt can still start before
+        # the deadline.
+        max_attempts = max_attempts or self.max_attempts
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self._count("rejected")
+                raise CircuitOpenError(
+                    f"{self.name} is failing; skipping it for {self.breaker.retry_in():.0f}s"
+                )
+            if not self.limiter.acquire(deadline):
+                self.breaker.release()
+                self._count("rejected")
+                raise RateLimitedError(f"{self.name} rate limit leaves no room before the deadline")
+            
+            self._count("calls")
+            try:
+                result = fn()
+            except Exception as e:
+                self._count("failures")
+                retryable, throttled = classify(e)
+                if not retryable:
+                    # The upstream answered; the request itself was bad.
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if throttled:
+                    self._count("throttled")
+                    self.limiter.throttle()
+                
+                attempt += 1
+                delay = _retry_after(e) or min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+                if attempt >= max_attempts or time.monotonic() + delay >= deadline:
+                    raise
+                self._count("retries")
+                time.sleep(delay)
+                continue
+            
+            self._count("successes")
+            self.breaker.record_success()
+            self.limiter.recover()
+            return result
+    
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "state": self.breaker.state,
+            "rate": round(self.limiter.rate, 3),
+            **counters
+        }
+
+_upstreams: Dict[str, Upstream] = {}
+_upstreams_lock = threading.Lock()
+
+def get_upstream(name: str) -> Upstream:
+    # One limiter and breaker per upstream, shared by every client of it.
+    # "groq:<model>" gets its own breaker with the limits of "groq".
+    with _upstreams_lock:
+        upstream = _upstreams.get(name)
+        if upstream is None:
+            base = name.split(":")[0]
+            rate, burst = UPSTREAM_LIMITS.get(base, (5.0, 10))
+            upstream = _upstreams[name] = Upstream(name, rate, burst, max_attempts=UPSTREAM_ATTEMPTS.get(base, 3))
+        return upstream
+
+def upstream_status() -> Dict[str, Dict[str, Any]]:
+    with _upstreams_lock:
+        upstreams = list(_upstreams.values())
+    return {upstream.name: upstream.status() for upstream in upstreams}
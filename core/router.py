@@ -0,0 +1,109 @@
+import re
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+AUTO = "auto"
+
+# Quality tier (1 = quick factual lookups, 3 = open-ended reasoning) and a
+# relative cost per request; the router picks the cheapest model whose tier
+# is high enough and whose window holds the prompt.
+MODEL_PROFILES = {
+    "llama3-8b-8192": {"window": 8192, "tier": 1, "cost": 1.0},
+    "gemma-7b-it": {"window": 8192, "tier": 1, "cost": 1.2},
+    "mixtral-8x7b-32768": {"window": 32768, "tier": 2, "cost": 3.0},
+    "llama3-70b-8192": {"window": 8192, "tier": 3, "cost": 8.0}
+}
+
+REASONING_WORDS = re.compile(
+    r"\b(why|how come|explain|compare|comparison|versus|vs|difference|differences|analy[sz]e|"
+    r"recommend|recommendations|similar|theme|themes|meaning|ending|interpret|review|worth)\b",
+    re.IGNORECASE
+)
+
+def estimate_tier(prompt: str) -> int:
+    words = len(prompt.split())
+    reasoning = len(REASONING_WORDS.findall(prompt))
+    questions = prompt.count("?")
+    if reasoning >= 2 or words > 40:
+        return 3
+    if reasoning or questions > 1 or words > 20:
+        return 2
+    return 1
+
+class ModelStats:
+    # Rolling view of a model's recent latencies and failures.
+    def __init__(self, samples: int = 50):
+        self.latencies = deque(maxlen=samples)
+        self.error_rate = 0.0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.failures = 0
+    
+    def median_latency(self) -> float:
+        return statistics.median(self.latencies) if self.latencies else 0.0
+
+class ModelRouter:
+    ERROR_DECAY = 0.2
+    # A model that just timed out or was rate limited is tried last for this
+    # long.
+    COOLDOWN = 30.0
+    
+    def __init__(self, profiles: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.profiles = profiles or MODEL_PROFILES
+        self.stats = {model: ModelStats() for model in self.profiles}
+        self._lock = threading.Lock()
+    
+    def candidates(self, prompt: str, prompt_tokens: int, reserved: int) -> List[str]:
+        tier = estimate_tier(prompt)
+        now = time.monotonic()
+        with self._lock:
+            def rank(model: str):
+                profile = self.profiles[model]
+                stats = self.stats[model]
+                return (
+                    profile["tier"] < tier,
+                    stats.cooldown_until > now,
+                    profile["cost"] * (1 + 4 * stats.error_rate),
+                    stats.median_latency()
+                )
+            fitting = [model for model, profile in self.profiles.items()
+                       if prompt_tokens + reserved <= profile["window"]]
+            # Models below the needed tier stay at the end as a last resort.
+            return sorted(fitting, key=rank)
+    
+    def window(self, prompt: str) -> int:
+        # The context budget is set before the context exists, so it is sized
+        # for the model an empty context would be routed to.
+        ranked = self.candidates(prompt, 0, 0)
+        return self.profiles[ranked[0]]["window"] if ranked else 8192
+    
+    def record(self, model: str, latency: Optional[float] = None, failed: bool = False, cooldown: bool = False):
+        with self._lock:
+            stats = self.stats.get(model)
+            if stats is None:
+                return
+            stats.requests += 1
+            stats.error_rate = (1 - self.ERROR_DECAY) * stats.error_rate + self.ERROR_DECAY * failed
+            if failed:
+                stats.failures += 1
+            if latency is not None and not failed:
+                stats.latencies.append(latency)
+            if cooldown:
+                stats.cooldown_until = time.monotonic() + self.COOLDOWN
+    
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                model: {
+                    "requests": stats.requests,
+                    "failures": stats.failures,
+                    "error_rate": round(stats.error_rate, 3),
+                    "median_ms": round(stats.median_latency() * 1000, 1),
+                    "cooling_down": stats.cooldown_until > now
+                }
+                for model, stats in self.stats.items()
+            }
@@ -1,30 +1,76 @@
-from duckduckgo_search import DDGS
-from typing import Dict, Any, List
-import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+import json
 import os
-import googleapiclient.discovery
+import re
+import threading
+import time
+from core.http import get_session
+from core.paths import data_path
+from core.resilience import get_upstream
+from core.titles import Title
+
+IMDB_ID = re.compile(r"^tt\d+$")
+
+# Context tools feed the LLM prompt; decoration tools (e.g. trailer links) are
+# only shown alongside the answer and never hold up the LLM request.
+CONTEXT = "context"
+DECORATION = "decoration"
 
 class SearchTool:
-    def __init__(self, name: str):
+    def __init__(self, name: str, key: Optional[str] = None, role: str = CONTEXT, timeout: float = 15.0):
         self.name = name
+        # Names the tool's entry in a query's tool_results.
+        self.key = key or "_".join(name.lower().split())
+        self.role = role
+        self.timeout = timeout
+        self.cacheable = True
+        
+    def build_query(self, query: str, title: Optional[Title] = None) -> str:
+        # A resolved title replaces the free text so equivalent questions map
+        # to the same upstream request and cache key.
+        return title.search_text if title else query
         
     def search(self, query: str) -> Dict[str, Any]:
         raise NotImplementedError("Subclasses must implement search method")
+    
+    def warm(self):
+        # Heavy clients and third-party modules are loaded on first use;
+        # subclasses load them here so it can happen in the background.
+        pass
 
 class DuckDuckGoSearch(SearchTool):
     def __init__(self):
-        super().__init__("DuckDuckGo Search")
+        super().__init__("DuckDuckGo Search", "search")
+        self.upstream = get_upstream("duckduckgo")
+        
+    def build_query(self, query: str, title: Optional[Title] = None) -> str:
+        return f"{super().build_query(query, title)} imdb rating release date director starring"
         
+    def warm(self):
+        import duckduckgo_search
+    
+    def _text_search(self, search_query: str, timeout: float) -> List[Dict[str, str]]:
+        from duckduckgo_search import DDGS
+        
+        with DDGS(timeout=timeout) as ddgs:
+            return list(ddgs.text(search_query, max_results=2)) #setting search results =2 for now.
+    
     def search(self, query: str) -> Dict[str, Any]:
         try:
-            with DDGS() as ddgs:
-                if "imdb" not in query.lower():
-                    search_query = f"{query} IMDB"
-                else:
-                    search_query = query
-                    
-                results = list(ddgs.text(search_query, max_results=2)) #setting search results =2 for now.
-                
+            if "imdb" not in query.lower():
+                search_query = f"{query} IMDB"
+            else:
+                search_query = query
+            
+            # DDGS retries on its own, so the upstream makes a single attempt
+            # and each request gets whatever is left of the tool's deadline.
+            deadline = time.monotonic() + self.timeout
+            results = self.upstream.call(
+                lambda: self._text_search(search_query, max(deadline - time.monotonic(), 1.0)), self.timeout
+            )
+            
             formatted_results = []
             for result in results:
                 formatted_results.append({
@@ -47,53 +93,104 @@ class DuckDuckGoSearch(SearchTool):
             }
 
 class OMDBSearch(SearchTool):
-    def __init__(self):
-        super().__init__("OMDB Search")
+    DETAIL_CACHE_SIZE = 512
+    
+    # Detail records keyed by imdbID, shared by every instance in the process.
+    _details = OrderedDict()
+    _details_lock = threading.Lock()
+    
+    def __init__(self, max_results: int = 3, request_timeout: float = 10.0):
+        super().__init__("OMDB Search", "omdb")
         self.api_key = os.getenv("OMDB_API_KEY")
         if not self.api_key:
             raise ValueError("OMDB API Key must be set in environment variables")
         self.base_url = "http://www.omdbapi.com/"
-        
+        self.max_results = max_results
+        self.request_timeout = request_timeout
+        self.upstream = get_upstream("omdb")
+        self.executor = ThreadPoolExecutor(max_workers=max_results, thread_name_prefix="omdb")
+    
+    @property
+    def session(self):
+        return get_session()
+    
+    def warm(self):
+        get_session()
+    
+    def _request(self, params: Dict[str, str]) -> Dict[str, Any]:
+        response = self.session.get(self.base_url, params=params, timeout=self.request_timeout)
+        response.raise_for_status()
+        return response.json()
+    
+    def _get(self, params: Dict[str, str]) -> Dict[str, Any]:
+        params = {"apikey": self.api_key, **params}
+        return self.upstream.call(lambda: self._request(params), self.timeout)
+    
+    def _cached_details(self, imdb_id: str) -> Optional[Dict[str, Any]]:
+        with self._details_lock:
+            details = self._details.get(imdb_id)
+            if details is not None:
+                self._details.move_to_end(imdb_id)
+            return details
+    
+    def _store_details(self, imdb_id: str, details: Dict[str, Any]):
+        with self._details_lock:
+            self._details[imdb_id] = details
+            self._details.move_to_end(imdb_id)
+            while len(self._details) > self.DETAIL_CACHE_SIZE:
+                self._details.popitem(last=False)
+    
+    def get_details(self, imdb_id: str) -> Optional[Dict[str, Any]]:
+        details = self._cached_details(imdb_id)
+        if details is None:
+            details = self._get({"i": imdb_id})
+            if details.get("Response") != "True":
+                return None
+            self._store_details(imdb_id, details)
+        return details
+    
+    def build_query(self, query: str, title: Optional[Title] = None) -> str:
+        return title.imdb_id if title else query
+    
+    def _format_details(self, detail_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "title": detail_data.get("Title", ""),
+            "year": detail_data.get("Year", ""),
+            "rating": detail_data.get("imdbRating", "N/A"),
+            "plot": detail_data.get("Plot", ""),
+            "director": detail_data.get("Director", ""),
+            "actors": detail_data.get("Actors", ""),
+            "genre": detail_data.get("Genre", ""),
+            "poster": detail_data.get("Poster", ""),
+            "imdbLink": f"https://www.imdb.com/title/{detail_data.get('imdbID', '')}"
+        }
+    
     def search(self, query: str) -> Dict[str, Any]:
         try:
+            # A resolved imdbID skips the title search entirely.
+            if IMDB_ID.match(query):
+                details = self.get_details(query)
+                return {
+                    "tool": self.name,
+                    "query": query,
+                    "results": [self._format_details(details)] if details else []
+                }
+            
             search_terms = query.lower()
             if "movie" in search_terms or "film" in search_terms or "series" in search_terms:
                 search_terms = search_terms.replace("movie", "").replace("film", "").replace("series", "").strip()
             
-            params = {
-                "apikey": self.api_key,
-                "s": search_terms
-            }
-            
-            response = requests.get(self.base_url, params=params)
-            data = response.json()
+            data = self._get({"s": search_terms})
             
             formatted_results = []
             
             if data.get("Response") == "True" and "Search" in data:
-                search_results = data["Search"][:3]
+                imdb_ids = [item["imdbID"] for item in data["Search"][:self.max_results]]
                 
-                for item in search_results:
-                    detail_params = {
-                        "apikey": self.api_key,
-                        "i": item["imdbID"]
-                    }
-                    
-                    detail_response = requests.get(self.base_url, params=detail_params)
-                    detail_data = detail_response.json()
-                    
-                    if detail_data.get("Response") == "True":
-                        formatted_results.append({
-                            "title": detail_data.get("Title", ""),
-                            "year": detail_data.get("Year", ""),
-                            "rating": detail_data.get("imdbRating", "N/A"),
-                            "plot": detail_data.get("Plot", ""),
-                            "director": detail_data.get("Director", ""),
-                            "actors": detail_data.get("Actors", ""),
-                            "genre": detail_data.get("Genre", ""),
-                            "poster": detail_data.get("Poster", ""),
-                            "imdbLink": f"https://www.imdb.com/title/{detail_data.get('imdbID', '')}"
-                        })
+                # Detail lookups run concurrently; map() keeps the search ranking.
+                for detail_data in self.executor.map(self.get_details, imdb_ids):
+                    if detail_data:
+                        formatted_results.append(self._format_details(detail_data))
                         
             return {
                 "tool": self.name,
@@ -110,15 +207,95 @@ class OMDBSearch(SearchTool):
             }
 
 class YouTubeSearch(SearchTool):
-    def __init__(self):
-        super().__init__("YouTube Search")
+    API_URL = "https://www.googleapis.com/youtube/v3"
+    DISCOVERY_DOCUMENT = "youtube_v3_discovery.json"
+    
+    def __init__(self, lean: bool = True, include_details: bool = False, request_timeout: float = 10.0):
+        super().__init__("YouTube Search", "youtube", role=DECORATION)
         self.api_key = os.getenv("YOUTUBE_API_KEY")
         if not self.api_key:
             raise ValueError("YouTube API Key must be set in environment variables")
-            
-        self.youtube = googleapiclient.discovery.build(
-            "youtube", "v3", developerKey=self.api_key
+        
+        # Lean mode calls the REST endpoints directly over the shared pooled
+        # session and never touches googleapiclient.
+        self.lean = lean
+        self.include_details = include_details
+        self.request_timeout = request_timeout
+        self.upstream = get_upstream("youtube")
+        
+        # Building the client loads googleapiclient and its discovery
+        # document, so it is deferred until the first search or warm().
+        self._youtube = None
+        self._youtube_lock = threading.Lock()
+    
+    @property
+    def youtube(self):
+        if self._youtube is None:
+            with self._youtube_lock:
+                if self._youtube is None:
+                    self._youtube = self._build_client()
+        return self._youtube
+    
+    def _build_client(self):
+        import googleapiclient.discovery
+        
+        # Prefer a locally stored discovery document, then the one bundled
+        # with googleapiclient; only fetch it over the network (once, and
+        # save it) on versions that ship without bundled documents.
+        document_path = data_path(self.DISCOVERY_DOCUMENT)
+        if os.path.exists(document_path):
+            with open(document_path, encoding="utf-8") as f:
+                return googleapiclient.discovery.build_from_document(f.read(), developerKey=self.api_key)
+        
+        try:
+            return googleapiclient.discovery.build(
+                "youtube", "v3", developerKey=self.api_key, static_discovery=True, cache_discovery=False
+            )
+        except TypeError:
+            client = googleapiclient.discovery.build(
+                "youtube", "v3", developerKey=self.api_key, cache_discovery=False
+            )
+            with open(document_path, "w", encoding="utf-8") as f:
+                json.dump(client._rootDesc, f)
+            return client
+    
+    def warm(self):
+        if self.lean:
+            get_session()
+        else:
+            self.youtube
+    
+    def _api_get(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        response = get_session().get(
+            f"{self.API_URL}/{endpoint}", params={**params, "key": self.api_key}, timeout=self.request_timeout
         )
+        response.raise_for_status()
+        return response.json()
+    
+    def _call(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        if self.lean:
+            request = lambda: self._api_get(endpoint, params)
+        else:
+            request = lambda: getattr(self.youtube, endpoint)().list(**params).execute()
+        return self.upstream.call(request, self.timeout)
+    
+    def fetch_video_details(self, video_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        # One videos.list call covers up to 50 IDs.
+        if not video_ids:
+            return {}
+        params = {"part": "contentDetails,statistics", "id": ",".join(video_ids[:50])}
+        response = self._call("videos", params)
+        
+        details = {}
+        for item in response.get("items", []):
+            details[item["id"]] = {
+                "duration": item.get("contentDetails", {}).get("duration", ""),
+                "views": item.get("statistics", {}).get("viewCount", "")
+            }
+        return details
+        
+    def build_query(self, query: str, title: Optional[Title] = None) -> str:
+        return f"{super().build_query(query, title)} trailer"
         
     def search(self, query: str) -> Dict[str, Any]:
         try:
@@ -131,12 +308,13 @@ class YouTubeSearch(SearchTool):
             if "movie" not in search_terms and "tv" not in search_terms and "show" not in search_terms:
                 search_terms += " movie"
             
-            search_response = self.youtube.search().list(
-                q=search_terms,
-                part="snippet",
-                maxResults=1,  # Only get the top result
-                type="video"
-            ).execute()
+            params = {
+                "q": search_terms,
+                "part": "snippet",
+                "maxResults": 1,  # Only get the top result
+                "type": "video"
+            }
+            search_response = self._call("search", params)
             
             formatted_results = []
             
@@ -149,6 +327,11 @@ class YouTubeSearch(SearchTool):
                     "link": f"https://www.youtube.com/watch?v={video_id}",
                     "videoId": video_id
                 })
+            
+            if self.include_details and formatted_results:
+                details = self.fetch_video_details([result["videoId"] for result in formatted_results])
+                for result in formatted_results:
+                    result.update(details.get(result["videoId"], {}))
                 
             return {
                 "tool": self.name,
@@ -162,4 +345,4 @@ class YouTubeSearch(SearchTool):
                 "query": query,
                 "error": str(e),
                 "results": []
-            }
\ No newline at end of file
+            }
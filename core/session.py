@@ -0,0 +1,115 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+from core.history import ConversationHistory, HistoryLog
+from core.paths import data_path
+
+SESSIONS_DIR = "sessions"
+
+def new_session_id() -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+class Session:
+    # One saved conversation: data/sessions/<id>/ holds the append-only
+    # history log, its offset index, a small meta.json and the merged film
+    # records in entities.json. Both JSON files are replaced atomically, so
+    # opening a session never has to read the whole log.
+    LOG = "history.jsonl"
+    INDEX = "history.idx"
+    META = "meta.json"
+    ENTITIES = "entities.json"
+    
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.directory = data_path(SESSIONS_DIR, session_id)
+        self.meta = self._read_meta() or {
+            "id": session_id,
+            "title": "",
+            "created": time.time(),
+            "updated": time.time(),
+            "turns": 0,
+            "entries": 0
+        }
+        self.log = HistoryLog(self._path(self.LOG), index_path=self._path(self.INDEX))
+        # Queries finish on several workers; one save runs at a time.
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def create(cls) -> "Session":
+        return cls(new_session_id())
+    
+    @classmethod
+    def open(cls, session_id: str) -> "Session":
+        if not os.path.exists(os.path.join(data_path(SESSIONS_DIR, session_id), cls.META)):
+            raise FileNotFoundError(f"No saved session named {session_id}")
+        return cls(session_id)
+    
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+    
+    def _read_json(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(name), encoding="utf-8") as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_json(self, name: str, data: Dict[str, Any]):
+        os.makedirs(self.directory, exist_ok=True)
+        handle_fd, temp_path = tempfile.mkstemp(prefix=name + ".", suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(handle_fd, "w", encoding="utf-8") as handle:
+                json.dump(data, handle)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temp_path, self._path(name))
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+    
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        return self._read_json(self.META)
+    
+    def history(self, window: int, tail: int) -> ConversationHistory:
+        history = ConversationHistory(window=window, log=self.log)
+        history.load_tail(tail)
+        return history
+    
+    def save(self, **fields: Any):
+        # The log is synced first so meta.json never describes entries that
+        # a crash could still lose.
+        with self._lock:
+            self.log.sync()
+            self.meta.update(fields)
+            self.meta["updated"] = time.time()
+            self.meta["entries"] = len(self.log)
+            self._write_json(self.META, self.meta)
+    
+    def load_entities(self) -> Optional[Dict[str, Any]]:
+        return self._read_json(self.ENTITIES)
+    
+    def save_entities(self, data: Dict[str, Any]):
+        with self._lock:
+            self._write_json(self.ENTITIES, data)
+    
+    def close(self):
+        self.log.close()
+
+def list_sessions() -> List[Dict[str, Any]]:
+    # Newest first; only meta.json is read for each session.
+    root = os.path.dirname(data_path(SESSIONS_DIR, ""))
+    sessions = []
+    for name in os.listdir(root):
+        try:
+            with open(os.path.join(root, name, Session.META), encoding="utf-8") as handle:
+                sessions.append(json.load(handle))
+        except (OSError, ValueError):
+            continue
+    return sorted(sessions, key=lambda meta: meta.get("updated", 0), reverse=True)
@@ -0,0 +1,95 @@
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+from core.cache import normalize_query
+from core.search import SearchTool
+from core.titles import Title
+
+class CallAbandoned(Exception):
+    # The leader stopped before finishing because its own caller went away;
+    # the waiters start the call over instead of failing.
+    pass
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    # Concurrent callers asking for the same key share one in-flight call:
+    # the first becomes the leader and runs it, the rest wait for its result
+    # (or its exception). Nothing is kept once the call completes.
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+    
+    def begin(self, key: str) -> Tuple[_Call, bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.calls += 1
+            return call, True
+    
+    def finish(self, key: str, call: _Call, result: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            if call.done.is_set():
+                return
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.result = result
+        call.error = error
+        call.done.set()
+    
+    def wait(self, call: _Call, timeout: Optional[float] = None) -> Any:
+        if not call.done.wait(timeout):
+            raise TimeoutError(f"Timed out after {timeout:g}s waiting for a shared call")
+        if call.error is not None:
+            raise call.error
+        return call.result
+    
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        call, leader = self.begin(key)
+        while not leader:
+            try:
+                return self.wait(call, timeout)
+            except CallAbandoned:
+                call, leader = self.begin(key)
+        
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result)
+        return result
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._calls)}
+
+class CoalescingSearchTool(SearchTool):
+    def __init__(self, tool: SearchTool, flight: SingleFlight):
+        super().__init__(tool.name, tool.key, role=tool.role, timeout=tool.timeout)
+        self.tool = tool
+        self.cacheable = tool.cacheable
+        self.flight = flight
+    
+    def build_query(self, query: str, title: Optional[Title] = None) -> str:
+        return self.tool.build_query(query, title)
+    
+    def warm(self):
+        self.tool.warm()
+    
+    def search(self, query: str) -> Dict[str, Any]:
+        results = self.flight.do(f"{self.key}\x1f{normalize_query(query)}",
+                                 lambda: self.tool.search(query), timeout=self.timeout)
+        # Every caller gets its own top-level dict, since the conversation
+        # trims and annotates the one it records.
+        return dict(results)
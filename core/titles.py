@@ -0,0 +1,188 @@
+import math
+import re
+import threading
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_non_word = re.compile(r"[^0-9a-z]+")
+_year = re.compile(r"\b(18[89]\d|19\d\d|20\d\d)\b")
+
+# Words trimmed from either end of a question before matching, so "Who
+# directed Inception and when was it released?" resolves on "inception".
+# Only the ends are trimmed: "of", "the" etc. stay inside titles.
+QUESTION_WORDS = {
+    "a", "about", "and", "any", "are", "can", "cast", "could", "details", "did", "directed", "director",
+    "do", "does", "film", "find", "for", "give", "how", "i", "imdb", "in", "info", "information", "is",
+    "it", "know", "like", "me", "movie", "of", "official", "on", "please", "plot", "rated", "rating",
+    "release", "released", "review", "reviews", "search", "series", "show", "starring", "tell", "the",
+    "to", "trailer", "tv", "was", "watch", "what", "whats", "when", "where", "which", "who", "with", "you"
+}
+
+# Words that join the parts of a title ("Lord of the Rings") and so do not
+# split a question into separate title candidates.
+CONNECTORS = {"a", "and", "for", "in", "of", "on", "the", "to", "with"}
+
+# "What's" and friends; the apostrophe would otherwise split off an "s".
+_contraction = re.compile(r"\b(what|who|where|when|how|which|that|it)['’]s\b", re.IGNORECASE)
+
+def normalize_title(text: str) -> str:
+    # Also builds the offline index's title_key column, so index keys and
+    # resolver keys always match.
+    return " ".join(_non_word.sub(" ", text.lower()).split())
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class Title:
+    __slots__ = ("title", "year", "imdb_id", "votes")
+    
+    def __init__(self, title: str, year: Optional[int], imdb_id: str, votes: int = 0):
+        self.title = title
+        self.year = year
+        self.imdb_id = imdb_id
+        self.votes = votes
+    
+    @property
+    def search_text(self) -> str:
+        return f"{self.title} {self.year}" if self.year else self.title
+    
+    def to_dict(self) -> Dict[str, object]:
+        return {"title": self.title, "year": self.year, "imdbID": self.imdb_id}
+
+class TitleResolver:
+    # Trigrams shared by more titles than this carry little signal and are
+    # skipped while gathering candidates to keep lookups sub-millisecond.
+    MAX_POSTINGS = 5000
+    
+    def __init__(self, titles: Iterable[Title] = (), min_score: float = 0.5):
+        self.min_score = min_score
+        self.titles: List[Title] = []
+        self._keys: List[str] = []
+        self._exact: Dict[str, List[int]] = defaultdict(list)
+        self._postings: Dict[str, array] = defaultdict(lambda: array("I"))
+        self._sizes = array("H")
+        for title in titles:
+            self.add(title)
+    
+    def add(self, title: Title):
+        key = normalize_title(title.title)
+        if not key:
+            return
+        title_id = len(self.titles)
+        self.titles.append(title)
+        self._keys.append(key)
+        self._exact[key].append(title_id)
+        grams = trigrams(key)
+        self._sizes.append(min(len(grams), 65535))
+        for gram in grams:
+            self._postings[gram].append(title_id)
+    
+    def __len__(self) -> int:
+        return len(self.titles)
+    
+    @staticmethod
+    def _trim(words: List[str]) -> List[str]:
+        # A leading "the" is kept for "The Matrix" but trimmed in "the
+        # director of ...", where a question word follows it.
+        words = list(words)
+        while words and words[0] in QUESTION_WORDS and (
+                words[0] != "the" or (len(words) > 1 and words[1] in QUESTION_WORDS)):
+            words.pop(0)
+        while words and words[-1] in QUESTION_WORDS:
+            words.pop()
+        return words
+    
+    @classmethod
+    def extract_title_text(cls, query: str) -> Tuple[str, Optional[int]]:
+        query = _contraction.sub(r"\1 is", query)
+        year_match = _year.search(query)
+        words = cls._trim(normalize_title(_year.sub(" ", query)).split())
+        # A title that is itself a year ("1917") keeps it.
+        if year_match and not words:
+            return " ".join(cls._trim(normalize_title(query).split())), None
+        return " ".join(words), int(year_match.group(0)) if year_match else None
+    
+    @staticmethod
+    def _spans(text: str) -> List[str]:
+        # Runs of words between question words, longest first, for questions
+        # where the title sits in the middle ("Inception, who made it").
+        spans, run = [], []
+        for word in text.split() + [None]:
+            if word is not None and (word not in QUESTION_WORDS or word in CONNECTORS):
+                run.append(word)
+                continue
+            while run and run[0] in CONNECTORS and run[0] != "the":
+                run.pop(0)
+            while run and run[-1] in CONNECTORS:
+                run.pop()
+            if run:
+                spans.append(" ".join(run))
+            run = []
+        return sorted(spans, key=len, reverse=True)
+    
+    def _rank(self, title_id: int, score: float, year: Optional[int]) -> float:
+        title = self.titles[title_id]
+        if year and title.year == year:
+            score += 0.5
+        # Popularity only breaks near-ties between similar titles.
+        return score + math.log10(title.votes + 1) / 100
+    
+    def resolve(self, query: str) -> Optional[Title]:
+        text, year = self.extract_title_text(query)
+        if not text:
+            return None
+        title = self._match(text, year)
+        if title is None:
+            for span in self._spans(text):
+                if span != text:
+                    title = self._match(span, year)
+                    if title is not None:
+                        break
+        return title
+    
+    def _match(self, text: str, year: Optional[int]) -> Optional[Title]:
+        exact = self._exact.get(text)
+        if exact:
+            return self.titles[max(exact, key=lambda title_id: self._rank(title_id, 1.0, year))]
+        
+        grams = trigrams(text)
+        shared = Counter()
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings is not None and len(postings) <= self.MAX_POSTINGS:
+                shared.update(postings)
+        
+        # A title can only reach min_score if it shares at least this many
+        # trigrams with the query, whatever its own length.
+        required = math.ceil(self.min_score / (1 + self.min_score) * len(grams))
+        
+        best_id, best_rank = None, 0.0
+        for title_id, count in shared.items():
+            if count < required:
+                continue
+            # Jaccard similarity between the trigram sets.
+            score = count / (len(grams) + self._sizes[title_id] - count)
+            if score < self.min_score:
+                continue
+            rank = self._rank(title_id, score, year)
+            if rank > best_rank:
+                best_id, best_rank = title_id, rank
+        
+        return self.titles[best_id] if best_id is not None else None
+
+class BackgroundResolver:
+    # Builds a TitleResolver on a worker thread; resolve() returns None until
+    # it is ready so startup is never held up by index loading.
+    def __init__(self, loader):
+        self._resolver: Optional[TitleResolver] = None
+        self._thread = threading.Thread(target=self._load, args=(loader,), daemon=True, name="title-resolver")
+        self._thread.start()
+    
+    def _load(self, loader):
+        self._resolver = TitleResolver(loader())
+    
+    def resolve(self, query: str) -> Optional[Title]:
+        resolver = self._resolver
+        return resolver.resolve(query) if resolver is not None else None
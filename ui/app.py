@@ -3,15 +3,34 @@ from tkinter import ttk, messagebox
 import threading
 import os
 
-from core.llm import LLMClient
-from core.search import DuckDuckGoSearch, OMDBSearch, YouTubeSearch
+from core.pipeline import build_llm, build_resolver, build_tools
 from core.conversation import ConversationManager
-from ui.components import ConversationDisplay, QueryInput
+from core.jobs import FINISHED, FAILED, QueryQueue
+from core.prefetch import Prefetcher
+from core.resilience import OPEN, upstream_status
+from core.session import Session, list_sessions
+from ui.components import ConversationDisplay, QueryInput, QueuePanel, SessionPicker
 from ui.styles import ThemeManager
 
 class RAGApp:
+    # Streamed tokens are batched and drawn at most this often (~30 fps).
+    STREAM_FRAME_MS = 33
+    # Questions answered at the same time; the rest wait in the queue.
+    QUERY_WORKERS = 2
+    # Finished queries stay listed in the queue panel this long.
+    FINISHED_JOB_MS = 5000
+    
     def __init__(self, root):
         self.root = root
+        self._stream_chunks = []
+        self._stream_scheduled = False
+        self._stream_lock = threading.Lock()
+        # Only one running query streams into the display at a time; the
+        # others show up when their turn is written to the history. A
+        # finished stream stays on screen until its turn is written, which
+        # waits for older turns that are still open.
+        self._stream_owner = None
+        self._held_stream = None
         
         self.root.title("Movie Research Assistant")
         icon_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "assets", "icon.ico")
@@ -26,36 +45,103 @@ class RAGApp:
         self.root.configure(background=ThemeManager.COLORS["background"])
         
         self.setup_tools()
+        self.setup_menu()
         self.setup_ui()
+        
+        self.queue = QueryQueue(
+            self._run_job,
+            workers=self.QUERY_WORKERS,
+            on_change=lambda job: self.root.after(0, self._on_job_change, job)
+        )
+        
+        # Heavy clients are built lazily; warm them once the window is up.
+        if self.conversation:
+            self.root.after(100, lambda: threading.Thread(target=self.conversation.warm, daemon=True).start())
     
     def setup_tools(self):
         try:
-            self.llm = LLMClient()
+            self.llm = build_llm()
             
-            # Initialize all search tools
-            tools = [DuckDuckGoSearch()]
+            self.tools = build_tools(self.show_warning)
+            self.resolver = build_resolver()
+            self.prefetcher = Prefetcher(self.tools, self.resolver)
             
-            # # Try to initialize OMDB API tool
-            # try:
-            #     tools.append(OMDBSearch())
-            # except ValueError as e:
-            #     self.show_warning(f"OMDB API: {str(e)}")
+            self.conversation = self._start_conversation(Session.create())
             
-            # Try to initialize YouTube API tool
-            try:
-                tools.append(YouTubeSearch())
-            except ValueError as e:
-                self.show_warning(f"YouTube API: {str(e)}")
-            
-            self.conversation = ConversationManager(tools, self.llm)
-            
-            active_tools = ", ".join([tool.name for tool in tools])
+            active_tools = ", ".join([tool.name for tool in self.tools])
             self.status_message = f"Ready to assist you | Active tools: {active_tools}"
         except ValueError as e:
             messagebox.showerror("API Key Error", str(e))
             self.status_message = "⚠️ Error: API key missing"
             self.conversation = None
     
+    def _start_conversation(self, session):
+        conversation = ConversationManager(self.tools, self.llm, resolver=self.resolver, session=session,
+                                           prefetcher=self.prefetcher)
+        conversation.add_listener(lambda: self.root.after(0, self._refresh_history))
+        return conversation
+    
+    def setup_menu(self):
+        menubar = tk.Menu(self.root)
+        session_menu = tk.Menu(menubar, tearoff=0)
+        session_menu.add_command(label="New Session", command=self.new_session)
+        session_menu.add_command(label="Open Session...", command=self.choose_session)
+        menubar.add_cascade(label="Session", menu=session_menu)
+        tools_menu = tk.Menu(menubar, tearoff=0)
+        tools_menu.add_command(label="Upstream Status", command=self.show_upstream_status)
+        menubar.add_cascade(label="Tools", menu=tools_menu)
+        self.root.config(menu=menubar)
+    
+    def _switch_session(self, session):
+        if self.queue.active():
+            messagebox.showinfo("Session", "Please wait for the queued queries to finish or cancel them.")
+            session.close()
+            return
+        if self._held_stream is not None:
+            self._end_stream()
+        previous = self.conversation
+        self.conversation = self._start_conversation(session)
+        if previous:
+            previous.executor.shutdown(wait=False)
+            previous.session.close()
+        self.conversation_display.clear()
+        self.conversation_display.update_history(self.conversation.history)
+        title = session.meta.get("title") or "New session"
+        self.status_var.set(f"📂 {title}")
+    
+    def new_session(self):
+        if self.conversation:
+            self._switch_session(Session.create())
+    
+    def choose_session(self):
+        if not self.conversation:
+            return
+        sessions = list_sessions()
+        if not sessions:
+            messagebox.showinfo("Session", "No saved sessions yet.")
+            return
+        SessionPicker(self.root, sessions, self.open_session)
+    
+    def open_session(self, session_id):
+        if session_id == self.conversation.session.id:
+            return
+        try:
+            session = Session.open(session_id)
+        except FileNotFoundError as e:
+            messagebox.showerror("Session", str(e))
+            return
+        self._switch_session(session)
+    
+    def show_upstream_status(self):
+        lines = []
+        for name, status in upstream_status().items():
+            lines.append(
+                f"{name}: {status['state']}, {status['rate']:g} req/s, "
+                f"{status['successes']}/{status['calls']} ok, {status['retries']} retries, "
+                f"{status['throttled']} throttled, {status['rejected']} rejected"
+            )
+        messagebox.showinfo("Upstream Status", "\n".join(lines) or "No upstream calls yet.")
+    
     def show_warning(self, message):
         messagebox.showwarning("API Key Warning", 
                               f"{message}\nSome features will be disabled.")
@@ -66,17 +152,21 @@ class RAGApp:
         main_frame.pack(fill=tk.BOTH, expand=True)
         
         # Add the conversation display with weight=5 (takes more space)
-        self.conversation_display = ConversationDisplay(main_frame)
+        self.conversation_display = ConversationDisplay(main_frame, max_turns=50)
         self.conversation_display.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
         
         # Add input area with weight=1 (takes less space)
         self.query_input = QueryInput(
             main_frame, 
             submit_callback=self.handle_query,
-            model_change_callback=self.update_model
+            model_change_callback=self.update_model,
+            prefetch_callback=self.prefetch if self.conversation else None
         )
         self.query_input.pack(fill=tk.X)
         
+        self.queue_panel = QueuePanel(main_frame, cancel_callback=self.cancel_query)
+        self.queue_panel.pack(fill=tk.X, pady=(10, 0))
+        
         # Status bar with custom styling
         self.status_var = tk.StringVar(value=self.status_message)
         status_bar = ttk.Label(
@@ -92,30 +182,92 @@ class RAGApp:
             self.llm.set_model(model_name)
             self.status_var.set(f"Model changed to: {model_name}")
     
+    def prefetch(self, text):
+        # Resolving is an in-memory lookup; the searches run on the
+        # prefetcher's own threads.
+        self.prefetcher.prefetch(text)
+    
     def handle_query(self, query):
         if not self.conversation:
             messagebox.showerror("Configuration Error", "Conversation manager not initialized. Please check your API keys.")
             return
         
-        self.status_var.set("🔄 Processing your query...")
-        self.query_input.set_state(tk.DISABLED)
+        self.queue.submit(query)
+    
+    def cancel_query(self, job_id):
+        self.queue.cancel(job_id)
+    
+    def _run_job(self, job):
+        response, _ = self.conversation.process_query(
+            job.query,
+            on_token=lambda chunk: self._on_token(job, chunk),
+            cancel_event=job.cancel_event,
+            on_progress=lambda stage: self.queue.set_stage(job, stage),
+            on_turn=lambda turn: setattr(job, "turn", turn)
+        )
+        return response
+    
+    def _on_job_change(self, job):
+        self.queue_panel.update_job(job)
+        
+        active = len(self.queue.active())
+        if job.state not in FINISHED:
+            self.status_var.set(f"🔄 Processing {active} quer{'y' if active == 1 else 'ies'}...")
+            return
+        
+        if self._stream_owner == job.id:
+            self._flush_stream()
+            if job.turn is None or self.conversation.is_recorded(job.turn):
+                self._end_stream()
+            else:
+                self._held_stream = job
+        self._refresh_history()
+        self.root.after(self.FINISHED_JOB_MS, self.queue_panel.remove_job, job.id)
+        
+        if job.state == FAILED:
+            messagebox.showerror("Processing Error", f"Error processing query: {job.error}")
         
-        threading.Thread(target=self._process_query_thread, args=(query,), daemon=True).start()
+        unavailable = [name for name, status in upstream_status().items() if status["state"] == OPEN]
+        if unavailable:
+            self.status_var.set(f"⚠️ Temporarily unavailable: {', '.join(unavailable)}")
+        elif active:
+            self.status_var.set(f"🔄 Processing {active} quer{'y' if active == 1 else 'ies'}...")
+        else:
+            self.status_var.set("✓ Ready to assist you")
     
-    def _process_query_thread(self, query):
-        try:
-            response, _ = self.conversation.process_query(query)
-            self.root.after(0, self._update_ui_after_query)
-        except Exception as e:
-            error_msg = f"Error processing query: {str(e)}"
-            self.root.after(0, lambda: messagebox.showerror("Processing Error", error_msg))
-            self.root.after(0, self._update_ui_after_query)
-    
-    def _update_ui_after_query(self):
+    def _on_token(self, job, chunk):
+        with self._stream_lock:
+            if self._stream_owner is None:
+                self._stream_owner = job.id
+            elif self._stream_owner != job.id:
+                return
+            self._stream_chunks.append(chunk)
+            if self._stream_scheduled:
+                return
+            self._stream_scheduled = True
+        self.root.after(self.STREAM_FRAME_MS, self._flush_stream)
+    
+    def _flush_stream(self):
+        with self._stream_lock:
+            text = "".join(self._stream_chunks)
+            self._stream_chunks.clear()
+            self._stream_scheduled = False
+        
+        if text:
+            if not self.conversation_display.streaming:
+                self.conversation_display.begin_stream()
+            self.conversation_display.append_stream(text)
+    
+    def _end_stream(self):
+        self.conversation_display.end_stream()
+        with self._stream_lock:
+            self._stream_owner = None
+            self._held_stream = None
+            self._stream_chunks.clear()
+    
+    def _refresh_history(self):
+        held = self._held_stream
+        if held is not None and self.conversation.is_recorded(held.turn):
+            self._end_stream()
         if self.conversation:
             self.conversation_display.update_history(self.conversation.history)
-        
-        self.query_input.set_state(tk.NORMAL)
-        self.query_input.query_entry.focus_set()
-        
-        self.status_var.set("✓ Ready to assist you")
\ No newline at end of file
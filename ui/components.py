@@ -1,13 +1,19 @@
 import tkinter as tk
 from tkinter import scrolledtext, ttk
 import webbrowser
-import re
+import time
+from core.extract import attach_facts
 from ui.styles import apply_text_styles, ThemeManager
 
 class ConversationDisplay(ttk.LabelFrame):
-    def __init__(self, parent, **kwargs):
+    # Older turns are brought back this many at a time when scrolling up.
+    LOAD_CHUNK_TURNS = 10
+    
+    def __init__(self, parent, max_turns=None, **kwargs):
         super().__init__(parent, text="Conversation History", padding=10, **kwargs)
         
+        self.max_turns = max_turns
+        
         container = ttk.Frame(self, padding=5)
         container.pack(fill=tk.BOTH, expand=True)
         
@@ -33,116 +39,288 @@ class ConversationDisplay(ttk.LabelFrame):
         
         self.history_text.config(state=tk.DISABLED)
         
+        self.streaming = False
+        self._deferred_history = None
+        
+        # Entries already drawn; update_history only appends what is new.
+        self._rendered_history = None
+        self._rendered_count = 0
+        
+        # History indices at which each turn starts, and the first turn still
+        # materialized in the widget. Line 1 is reserved for the placeholder
+        # that stands in for the turns trimmed off the top.
+        self._turn_starts = []
+        self._first_turn = 0
+        self._loading = False
+        self.history_text.config(state=tk.NORMAL)
+        self.history_text.insert("1.0", "\n")
+        self.history_text.config(state=tk.DISABLED)
+        self.history_text.mark_set("render_point", "end-1c")
+        self.history_text.mark_gravity("render_point", tk.RIGHT)
+        self.history_text.tag_config("placeholder", foreground=ThemeManager.COLORS["text_light"], justify=tk.CENTER)
+        self.history_text.tag_bind("placeholder", "<Button-1>", lambda e: self.load_older_turns())
+        self.history_text.config(yscrollcommand=self._on_yscroll)
+        
+        # Every link shares the one "link" tag and click handler; the URL is
+        # looked up from the mark that starts the clicked range.
+        self._link_urls = {}
+        self._link_counter = 0
+        self.history_text.tag_config("link", foreground=ThemeManager.COLORS["link"], underline=1)
+        self.history_text.tag_bind("link", "<Button-1>", self._on_link_click)
+        self.history_text.tag_bind("link", "<Enter>", lambda e: self.history_text.config(cursor="hand2"))
+        self.history_text.tag_bind("link", "<Leave>", lambda e: self.history_text.config(cursor=""))
+    
+    def begin_stream(self):
+        self.streaming = True
+        self.history_text.config(state=tk.NORMAL)
+        self.history_text.mark_set("stream_start", tk.END + "-1c")
+        self.history_text.mark_gravity("stream_start", tk.LEFT)
+        self.history_text.insert(tk.END, "Assistant: ", "assistant")
+        self.history_text.config(state=tk.DISABLED)
+        self.history_text.see(tk.END)
+    
+    def append_stream(self, text):
+        self.history_text.config(state=tk.NORMAL)
+        self.history_text.insert(tk.END, text, "assistant")
+        self.history_text.config(state=tk.DISABLED)
+        self.history_text.see(tk.END)
+    
+    def end_stream(self):
+        if not self.streaming:
+            return
+        # The streamed text is a placeholder; the final history entry replaces it.
+        self.history_text.config(state=tk.NORMAL)
+        self.history_text.delete("stream_start", tk.END)
+        self.history_text.config(state=tk.DISABLED)
+        self.streaming = False
+        
+        if self._deferred_history is not None:
+            history, self._deferred_history = self._deferred_history, None
+            self.update_history(history)
+        
     def update_history(self, conversation_history):
+        if self.streaming:
+            self._deferred_history = conversation_history
+            return
+        
+        if conversation_history is not self._rendered_history or len(conversation_history) < self._rendered_count:
+            self.clear()
+            self._rendered_history = conversation_history
+        
+        if len(conversation_history) <= self._rendered_count:
+            return
+        
+        start = self._rendered_count
+        first_new_turn = len(self._turn_starts)
+        for index in range(start, len(conversation_history)):
+            if conversation_history.role(index) == "user" or not self._turn_starts:
+                self._turn_starts.append(index)
+        
         self.history_text.config(state=tk.NORMAL)
-        self.history_text.delete(1.0, tk.END)
-        
-        for entry in conversation_history:
-            if entry["role"] == "user":
-                self.history_text.insert(tk.END, "You: ", "user")
-                self.history_text.insert(tk.END, f"{entry['content']}\n\n", "user")
-            elif entry["role"] == "assistant":
-                self.history_text.insert(tk.END, "Assistant: ", "assistant")
-                self.history_text.insert(tk.END, f"{entry['content']}\n\n", "assistant")
-            elif entry["role"] == "tool":
-                self.history_text.insert(tk.END, "─" * 80 + "\n", "tool_header")
-                
-                tool_name = entry['tool']
-                
-                if tool_name == "YouTube Search":
-                    self.history_text.insert(tk.END, f"🎬 Trailer Search: '{entry['query']}'\n", "tool_header")
-                else:
-                    self.history_text.insert(tk.END, f"{tool_name}: '{entry['query']}'\n", "tool_header")
-                
-                results = entry["results"].get("results", [])
-                if results:
-                    if tool_name == "DuckDuckGo Search":
-                        self._insert_duckduckgo_results(results)
-                    elif tool_name == "OMDB Search":
-                        self._insert_omdb_results(results)
-                    elif tool_name == "YouTube Search":
-                        self._insert_youtube_results(results)
-                else:
-                    error = entry["results"].get("error", "No results found")
-                    self.history_text.insert(tk.END, f"No results: {error}\n", "tool_error")
-                
-                self.history_text.insert(tk.END, "─" * 80 + "\n\n", "tool_header")
+        
+        # When the new entries alone fill the bounded view (e.g. the first
+        # render of a long history), skip straight to the turns that will be
+        # kept instead of drawing everything and trimming it again.
+        if self.max_turns:
+            keep_from = len(self._turn_starts) - self.max_turns
+            if keep_from >= first_new_turn and keep_from > self._first_turn:
+                self._discard_turns(keep_from, "end-1c")
+                start = self._turn_starts[keep_from]
+                first_new_turn = keep_from
+        
+        new_turns = {self._turn_starts[turn]: turn for turn in range(first_new_turn, len(self._turn_starts))}
+        self.history_text.mark_set("render_point", "end-1c")
+        
+        for index in range(start, len(conversation_history)):
+            if index in new_turns:
+                self._set_turn_mark(new_turns[index])
+            self._insert_entry(conversation_history[index])
+        self._rendered_count = len(conversation_history)
+        
+        self._trim_old_turns()
         
         self.history_text.config(state=tk.DISABLED)
         self.history_text.see(tk.END)
     
-    def _insert_duckduckgo_results(self, results):
-        self.history_text.insert(tk.END, "📊 IMDB Information:\n", "tool_section")
+    def clear(self):
+        self.history_text.config(state=tk.NORMAL)
+        self.history_text.delete("1.0", tk.END)
+        self.history_text.insert("1.0", "\n")
+        self.history_text.config(state=tk.DISABLED)
+        for mark in self._link_urls:
+            self.history_text.mark_unset(mark)
+        for turn in range(self._first_turn, len(self._turn_starts)):
+            self.history_text.mark_unset(f"turn_{turn}")
+        self._link_urls.clear()
+        self._rendered_history = None
+        self._rendered_count = 0
+        self._turn_starts = []
+        self._first_turn = 0
+    
+    def _set_turn_mark(self, turn):
+        self.history_text.mark_set(f"turn_{turn}", "render_point")
+        self.history_text.mark_gravity(f"turn_{turn}", tk.LEFT)
+    
+    def _update_placeholder(self):
+        self.history_text.delete("1.0", "1.end")
+        if self._first_turn:
+            text = f"⬆ {self._first_turn} earlier turns hidden (scroll up or click to show)"
+            self.history_text.insert("1.0", text, "placeholder")
+    
+    def _discard_turns(self, first_turn, cut):
+        for _, mark, _ in self.history_text.dump("2.0", cut, mark=True):
+            if mark in self._link_urls:
+                del self._link_urls[mark]
+                self.history_text.mark_unset(mark)
+        for turn in range(self._first_turn, first_turn):
+            self.history_text.mark_unset(f"turn_{turn}")
         
-        movie_info = {}
-        for result in results:
-            title = result.get("title", "")
-            snippet = result.get("snippet", "")
+        self.history_text.delete("2.0", cut)
+        self._first_turn = first_turn
+        self._update_placeholder()
+    
+    def _trim_old_turns(self):
+        if not self.max_turns or len(self._turn_starts) - self._first_turn <= self.max_turns:
+            return
+        
+        first_turn = len(self._turn_starts) - self.max_turns
+        self._discard_turns(first_turn, f"turn_{first_turn}")
+    
+    def load_older_turns(self):
+        if not self._first_turn or self._rendered_history is None or self._loading:
+            return
+        
+        self._loading = True
+        new_first = max(self._first_turn - self.LOAD_CHUNK_TURNS, 0)
+        anchor = f"turn_{self._first_turn}"
+        
+        self.history_text.config(state=tk.NORMAL)
+        # Render the older turns into a fresh line right after the placeholder,
+        # ahead of the marks of the first turn already shown, then drop the
+        # spare newline that separated them.
+        self.history_text.insert("1.end", "\n")
+        self.history_text.mark_set("render_point", "2.0")
+        for turn in range(new_first, self._first_turn):
+            self._set_turn_mark(turn)
+            end = self._turn_starts[turn + 1] if turn + 1 < len(self._turn_starts) else self._rendered_count
+            for index in range(self._turn_starts[turn], end):
+                self._insert_entry(self._rendered_history[index])
+        self.history_text.delete("render_point")
+        
+        self._first_turn = new_first
+        self._update_placeholder()
+        self.history_text.config(state=tk.DISABLED)
+        
+        self.history_text.yview(anchor)
+        self._loading = False
+    
+    def _on_yscroll(self, first, last):
+        self.history_text.vbar.set(first, last)
+        # Scrolling to the very top of a view that overflows the widget
+        # brings back the next chunk of collapsed turns.
+        if float(first) <= 0.0 and float(last) < 1.0 and self._first_turn and not self._loading:
+            self.after_idle(self.load_older_turns)
+    
+    def _insert(self, text, tags):
+        self.history_text.insert("render_point", text, tags)
+    
+    def _insert_entry(self, entry):
+        if entry["role"] == "user":
+            self._insert("You: ", "user")
+            self._insert(f"{entry['content']}\n\n", "user")
+        elif entry["role"] == "assistant":
+            self._insert("Assistant: ", "assistant")
+            self._insert(f"{entry['content']}\n\n", "assistant")
+        elif entry["role"] == "tool":
+            self._insert("─" * 80 + "\n", "tool_header")
+            
+            tool_name = entry['tool']
+            
+            if tool_name == "YouTube Search":
+                self._insert(f"🎬 Trailer Search: '{entry['query']}'\n", "tool_header")
+            else:
+                self._insert(f"{tool_name}: '{entry['query']}'\n", "tool_header")
             
-            if "rating" in snippet.lower() and "rating" not in movie_info:
-                rating_match = re.search(r'(\d+(\.\d+)?)/10', snippet)
-                if rating_match:
-                    movie_info["rating"] = rating_match.group(0)
-                    
-            if "release" in snippet.lower() and "release_date" not in movie_info:
-                date_match = re.search(r'released on ([A-Za-z]+ \d+, \d{4})|(\d{1,2} [A-Za-z]+ \d{4})', snippet)
-                if date_match:
-                    movie_info["release_date"] = date_match.group(0)
-                    
-            if "direct" in snippet.lower() and "director" not in movie_info:
-                dir_match = re.search(r'directed by ([A-Za-z ]+)', snippet)
-                if dir_match:
-                    movie_info["director"] = dir_match.group(1)
-                    
-            if "star" in snippet.lower() and "cast" not in movie_info:
-                cast_match = re.search(r'starring ([A-Za-z ,]+)', snippet)
-                if cast_match:
-                    movie_info["cast"] = cast_match.group(1)
+            results = entry["results"].get("results", [])
+            if results:
+                if tool_name == "DuckDuckGo Search":
+                    self._insert_duckduckgo_results(entry["results"])
+                elif tool_name == "OMDB Search":
+                    self._insert_omdb_results(results)
+                elif tool_name == "YouTube Search":
+                    self._insert_youtube_results(results)
+            else:
+                error = entry["results"].get("error", "No results found")
+                self._insert(f"No results: {error}\n", "tool_error")
+            
+            self._insert("─" * 80 + "\n\n", "tool_header")
+    
+    def _insert_link(self, url):
+        self._link_counter += 1
+        mark = f"link_{self._link_counter}"
+        self.history_text.mark_set(mark, "render_point")
+        self.history_text.mark_gravity(mark, tk.LEFT)
+        self._link_urls[mark] = url
+        
+        self._insert(url, ("tool_link", "link"))
+        self._insert("\n\n", "tool_link")
+    
+    def _on_link_click(self, event):
+        index = self.history_text.index(f"@{event.x},{event.y}")
+        link_range = self.history_text.tag_prevrange("link", f"{index}+1c")
+        if not link_range:
+            return
+        for _, mark, _ in self.history_text.dump(link_range[0], f"{link_range[0]}+1c", mark=True):
+            url = self._link_urls.get(mark)
+            if url:
+                webbrowser.open(url)
+                return
+    
+    def _insert_duckduckgo_results(self, entry_results):
+        results = entry_results.get("results", [])
+        self._insert("📊 IMDB Information:\n", "tool_section")
+        
+        # Facts are extracted once when the result is stored; entries saved
+        # before that are given them on first render.
+        attach_facts("DuckDuckGo Search", entry_results)
+        movie_info = entry_results["facts"]
         
         if movie_info:
-            main_title = results[0].get("title", "").split(" - ")[0] if results else "Movie/Show"
-            self.history_text.insert(tk.END, f"📽️ {main_title}\n", "movie_title")
+            self._insert(f"📽️ {movie_info.get('title') or 'Movie/Show'}\n", "movie_title")
             
             if "rating" in movie_info:
-                self.history_text.insert(tk.END, "Rating: ", "info_label")
-                self.history_text.insert(tk.END, f"⭐ {movie_info['rating']}\n", "info_value_bold")
+                self._insert("Rating: ", "info_label")
+                self._insert(f"⭐ {movie_info['rating']}\n", "info_value_bold")
                 
             if "release_date" in movie_info:
-                self.history_text.insert(tk.END, "Released: ", "info_label")
-                self.history_text.insert(tk.END, f"{movie_info['release_date']}\n", "info_value")
+                self._insert("Released: ", "info_label")
+                self._insert(f"{movie_info['release_date']}\n", "info_value")
                 
             if "director" in movie_info:
-                self.history_text.insert(tk.END, "Director: ", "info_label")
-                self.history_text.insert(tk.END, f"{movie_info['director']}\n", "info_value")
+                self._insert("Director: ", "info_label")
+                self._insert(f"{movie_info['director']}\n", "info_value")
                 
             if "cast" in movie_info:
-                self.history_text.insert(tk.END, "Cast: ", "info_label")
-                self.history_text.insert(tk.END, f"{movie_info['cast']}\n", "info_value")
+                self._insert("Cast: ", "info_label")
+                self._insert(f"{movie_info['cast']}\n", "info_value")
             
-            self.history_text.insert(tk.END, "\n", "tool_detail")
+            self._insert("\n", "tool_detail")
         
-        self.history_text.insert(tk.END, "🔍 Search Results:\n", "results_header")
+        self._insert("🔍 Search Results:\n", "results_header")
         
         for i, result in enumerate(results, 1):
             title = result.get("title", "")
             snippet = result.get("snippet", "")
             link = result.get("link", "")
             
-            self.history_text.insert(tk.END, f"{i}. {title}\n", "tool_item")
-            self.history_text.insert(tk.END, f"{snippet}\n", "tool_detail")
-            self.history_text.insert(tk.END, f"Source: ", "tool_link_label")
+            self._insert(f"{i}. {title}\n", "tool_item")
+            self._insert(f"{snippet}\n", "tool_detail")
+            self._insert(f"Source: ", "tool_link_label")
             
-            link_start = self.history_text.index(tk.INSERT)
-            self.history_text.insert(tk.END, f"{link}\n\n", "tool_link")
-            link_end = self.history_text.index(tk.INSERT)
-            
-            link_tag = f"link_{i}_{hash(link)}"
-            self.history_text.tag_add(link_tag, link_start, link_end)
-            self.history_text.tag_config(link_tag, foreground=ThemeManager.COLORS["link"], underline=1)
-            self.history_text.tag_bind(link_tag, "<Button-1>", lambda e, url=link: webbrowser.open(url))    
+            self._insert_link(link)    
 
     def _insert_omdb_results(self, results):
-        self.history_text.insert(tk.END, "🎬 Movie Details:\n", "tool_section")
+        self._insert("🎬 Movie Details:\n", "tool_section")
         
         for i, result in enumerate(results, 1):
             title = result.get("title", "")
@@ -154,46 +332,37 @@ class ConversationDisplay(ttk.LabelFrame):
             plot = result.get("plot", "")
             imdb_link = result.get("imdbLink", "")
             
-            self.history_text.insert(tk.END, f"{i}. {title} ({year})\n", "tool_item")
-            self.history_text.insert(tk.END, f"Rating: ⭐ {rating}/10 | Genre: {genre}\n", "tool_detail")
-            self.history_text.insert(tk.END, f"Director: {director}\n", "tool_detail")
-            self.history_text.insert(tk.END, f"Cast: {actors}\n", "tool_detail")
-            self.history_text.insert(tk.END, f"Plot: {plot}\n", "tool_detail")
-            self.history_text.insert(tk.END, f"IMDB: ", "tool_link_label")
-            
-            link_start = self.history_text.index(tk.INSERT)
-            self.history_text.insert(tk.END, f"{imdb_link}\n\n", "tool_link")
-            link_end = self.history_text.index(tk.INSERT)
+            self._insert(f"{i}. {title} ({year})\n", "tool_item")
+            self._insert(f"Rating: ⭐ {rating}/10 | Genre: {genre}\n", "tool_detail")
+            self._insert(f"Director: {director}\n", "tool_detail")
+            self._insert(f"Cast: {actors}\n", "tool_detail")
+            self._insert(f"Plot: {plot}\n", "tool_detail")
+            self._insert(f"IMDB: ", "tool_link_label")
             
-            link_tag = f"imdb_link_{i}_{hash(imdb_link)}"
-            self.history_text.tag_add(link_tag, link_start, link_end)
-            self.history_text.tag_config(link_tag, foreground=ThemeManager.COLORS["link"], underline=1)
-            self.history_text.tag_bind(link_tag, "<Button-1>", lambda e, url=imdb_link: webbrowser.open(url))
+            self._insert_link(imdb_link)
     
     def _insert_youtube_results(self, results):
-        self.history_text.insert(tk.END, "🎥 Trailer:\n", "tool_section")
+        self._insert("🎥 Trailer:\n", "tool_section")
         
         for i, result in enumerate(results, 1):
             title = result.get("title", "")
             link = result.get("link", "")
             
-            self.history_text.insert(tk.END, f"🎬 {title}\n", "tool_item")
-            self.history_text.insert(tk.END, f"Watch Trailer: ", "tool_link_label")
-            
-            link_start = self.history_text.index(tk.INSERT)
-            self.history_text.insert(tk.END, f"{link}\n\n", "tool_link")
-            link_end = self.history_text.index(tk.INSERT)
+            self._insert(f"🎬 {title}\n", "tool_item")
+            self._insert(f"Watch Trailer: ", "tool_link_label")
             
-            link_tag = f"youtube_link_{i}_{hash(link)}"
-            self.history_text.tag_add(link_tag, link_start, link_end)
-            self.history_text.tag_config(link_tag, foreground=ThemeManager.COLORS["link"], underline=1)
-            self.history_text.tag_bind(link_tag, "<Button-1>", lambda e, url=link: webbrowser.open(url))
+            self._insert_link(link)
 
 class QueryInput(ttk.Frame):
-    def __init__(self, parent, submit_callback, model_change_callback, **kwargs):
+    # Typing pauses this long before a speculative prefetch is started.
+    PREFETCH_DEBOUNCE_MS = 400
+    
+    def __init__(self, parent, submit_callback, model_change_callback, prefetch_callback=None, **kwargs):
         super().__init__(parent, padding=10, **kwargs)
         
         self.submit_callback = submit_callback
+        self.prefetch_callback = prefetch_callback
+        self._prefetch_job = None
         
         ttk.Label(
             self, 
@@ -208,6 +377,7 @@ class QueryInput(ttk.Frame):
         self.query_entry = ttk.Entry(input_row, width=70)
         self.query_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10))
         self.query_entry.bind("<Return>", self.on_submit)
+        self.query_entry.bind("<KeyRelease>", self.on_key_release)
         
         search_button = ttk.Button(
             input_row, 
@@ -228,7 +398,7 @@ class QueryInput(ttk.Frame):
         )
         model_label.pack(side=tk.LEFT, padx=(0, 10))
         
-        self.model_var = tk.StringVar(value="llama3-70b-8192")
+        self.model_var = tk.StringVar(value="auto")
         model_options = ttk.Combobox(
             model_frame, 
             textvariable=self.model_var, 
@@ -236,6 +406,7 @@ class QueryInput(ttk.Frame):
             state="readonly"
         )
         model_options['values'] = (
+            "auto",
             "llama3-70b-8192",
             "llama3-8b-8192",
             "mixtral-8x7b-32768",
@@ -244,6 +415,15 @@ class QueryInput(ttk.Frame):
         model_options.pack(side=tk.LEFT, padx=(0, 5))
         model_options.bind("<<ComboboxSelected>>", lambda e: model_change_callback(self.model_var.get()))
         
+        self.prefetch_var = tk.BooleanVar(value=False)
+        if prefetch_callback:
+            ttk.Checkbutton(
+                model_frame, 
+                text="⚡ Search while typing",
+                variable=self.prefetch_var,
+                command=self.on_prefetch_toggle
+            ).pack(side=tk.LEFT, padx=(15, 0))
+        
         ttk.Label(
             self, 
             text="Try: 'Tell me about The Batman' or 'Show me information about Oppenheimer'",
@@ -253,11 +433,121 @@ class QueryInput(ttk.Frame):
         
         self.query_entry.focus_set()
     
+    def on_key_release(self, event=None):
+        if not self.prefetch_var.get() or event.keysym == "Return":
+            return
+        if self._prefetch_job:
+            self.after_cancel(self._prefetch_job)
+        self._prefetch_job = self.after(self.PREFETCH_DEBOUNCE_MS, self._fire_prefetch)
+    
+    def _fire_prefetch(self):
+        self._prefetch_job = None
+        self.prefetch_callback(self.query_entry.get())
+    
+    def on_prefetch_toggle(self):
+        if not self.prefetch_var.get():
+            if self._prefetch_job:
+                self.after_cancel(self._prefetch_job)
+                self._prefetch_job = None
+            # An empty query cancels whatever is still queued.
+            self.prefetch_callback("")
+    
     def on_submit(self, event=None):
+        if self._prefetch_job:
+            self.after_cancel(self._prefetch_job)
+            self._prefetch_job = None
         query = self.query_entry.get().strip()
         if query:
             self.submit_callback(query)
             self.query_entry.delete(0, tk.END)
     
     def set_state(self, state):
-        self.query_entry.config(state=state)
\ No newline at end of file
+        self.query_entry.config(state=state)
+
+class SessionPicker(tk.Toplevel):
+    def __init__(self, parent, sessions, open_callback, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.title("Open Session")
+        self.configure(background=ThemeManager.COLORS["background"])
+        self.transient(parent)
+        
+        self.sessions = sessions
+        self.open_callback = open_callback
+        
+        frame = ttk.Frame(self, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(
+            frame, 
+            text="📂 Saved sessions:",
+            font=("Segoe UI", 11, "bold"),
+            foreground=ThemeManager.COLORS["primary"]
+        ).pack(anchor=tk.W, pady=(0, 5))
+        
+        self.session_list = tk.Listbox(frame, width=70, height=12, activestyle="none")
+        self.session_list.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        for meta in sessions:
+            updated = time.strftime("%Y-%m-%d %H:%M", time.localtime(meta.get("updated", 0)))
+            self.session_list.insert(tk.END, f"{updated}  ·  {meta.get('title') or meta['id']}  ({meta.get('turns', 0)} turns)")
+        self.session_list.bind("<Double-Button-1>", self.on_open)
+        
+        ttk.Button(
+            frame, 
+            text="Open",
+            style="Main.TButton",
+            command=self.on_open
+        ).pack(side=tk.RIGHT)
+        
+        self.session_list.focus_set()
+    
+    def on_open(self, event=None):
+        selection = self.session_list.curselection()
+        if selection:
+            self.destroy()
+            self.open_callback(self.sessions[selection[0]]["id"])
+
+class QueuePanel(ttk.Frame):
+    def __init__(self, parent, cancel_callback, **kwargs):
+        super().__init__(parent, padding=(10, 0), **kwargs)
+        
+        self.cancel_callback = cancel_callback
+        
+        header = ttk.Frame(self)
+        header.pack(fill=tk.X, pady=(0, 5))
+        
+        ttk.Label(
+            header, 
+            text="⏳ Queries:",
+            font=("Segoe UI", 10),
+            foreground=ThemeManager.COLORS["secondary"]
+        ).pack(side=tk.LEFT)
+        
+        ttk.Button(
+            header, 
+            text="Cancel",
+            command=self.on_cancel
+        ).pack(side=tk.RIGHT)
+        
+        self.tree = ttk.Treeview(self, columns=("query", "status"), show="headings", height=3, selectmode="browse")
+        self.tree.heading("query", text="Question")
+        self.tree.heading("status", text="Status")
+        self.tree.column("query", width=420)
+        self.tree.column("status", width=140, anchor=tk.W)
+        self.tree.pack(fill=tk.X)
+    
+    def update_job(self, job):
+        item = str(job.id)
+        if self.tree.exists(item):
+            self.tree.item(item, values=(job.query, job.status))
+        else:
+            self.tree.insert("", tk.END, iid=item, values=(job.query, job.status))
+            self.tree.see(item)
+    
+    def remove_job(self, job_id):
+        if self.tree.exists(str(job_id)):
+            self.tree.delete(str(job_id))
+    
+    def on_cancel(self):
+        selection = self.tree.selection()
+        if selection:
+            self.cancel_callback(int(selection[0]))